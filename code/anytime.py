@@ -0,0 +1,125 @@
+import time
+import utils
+import numpy as np
+import integer_program as ip
+import quick_sort_base as qsb
+import localsearch, chanas, simulated_annealing, tabu_search
+
+from collections import namedtuple
+
+"""
+Deadline-aware aggregation. aggregate() first runs the cheap
+aggregators, which only need the precedence matrix or the average
+ranks, and then spends whatever remains of the deadline improving
+the best of their rankings. When the deadline passes, the best
+ranking found so far is returned.
+"""
+
+# sigma: the best full ranking found
+# cost: its generalized Kendall Tau Distance
+# lowerBound: a lower bound on the distance of any full ranking
+# gap: (cost - lowerBound) / cost, 0 when the ranking is optimal
+# algorithm: the name of the step that produced sigma
+# elapsed: wall-clock seconds spent
+AggregationResult = namedtuple("AggregationResult",
+                               ["sigma", "cost", "lowerBound", "gap", "algorithm", "elapsed"])
+
+IMPROVEMENT_ALGORITHMS = ("Local-Search", "Chanas", "Simulated-Annealing", "Tabu-Search", "Opt")
+
+
+def aggregate(data, params, algorithm="Local-Search", deadline=None):
+    """
+    Aggregates the top-lists in data within 'deadline' seconds.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+
+    'algorithm': str
+              The improvement step, one of IMPROVEMENT_ALGORITHMS.
+              "Opt" builds the integer program, checking the deadline
+              as it adds the O(n^3) transitivity constraints, and gives
+              the solver whatever time then remains. If the deadline
+              passes while building, the best cheap ranking is returned.
+
+    'deadline': float
+              Wall-clock seconds, counted from the call, after which
+              the best ranking so far is returned. No deadline if
+              not provided, in which case every step runs to completion.
+    ------------------------------------
+
+    Returns
+
+    An AggregationResult
+    """
+    if algorithm not in IMPROVEMENT_ALGORITHMS:
+        raise ValueError(f"{algorithm} is not one of {IMPROVEMENT_ALGORITHMS}")
+
+    start = time.time()
+    end = None if deadline is None else start + deadline
+
+    def remaining():
+        return None if end is None else max(end - time.time(), 0)
+
+    def expired():
+        return end is not None and time.time() >= end
+
+    n = params['n']
+    N = params['N']
+    rng = np.random.default_rng(params['seed'])
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+    lowerBound = utils.pairwiseLowerBound(precedenceMatrix, N)
+
+    best = [None, float('inf'), None]
+    def consider(name, sigma):
+        cost = utils.precedenceKendallTauDistance(sigma, precedenceMatrix, N)
+        if cost < best[1]:
+            best[:] = [tuple(int(i) for i in sigma), cost, name]
+
+    # Cheap aggregators, always starting with one so that
+    # some ranking exists however short the deadline
+    def copelandRanking():
+        victories = utils.pairwiseVictories(precedenceMatrix)
+        return np.argsort(-victories, kind='stable')
+
+    cheap = (("Borda+", lambda: np.argsort(utils.avgRanks(data, n, N))),
+             ("Copeland", copelandRanking),
+             ("KwikSort", lambda: qsb.best_of_runs((precedenceMatrix >= precedenceMatrix.T).astype(float),
+                                                   precedenceMatrix, 1, rng)))
+
+    for name, ranking in cheap:
+        consider(name, ranking())
+        if expired():
+            break
+
+    # Improvement of the best cheap ranking
+    if not expired() and best[1] > lowerBound:
+        sigma = best[0]
+        if algorithm == "Local-Search":
+            sigma = localsearch.search(sigma, precedenceMatrix, rng, end)
+        elif algorithm == "Chanas":
+            sigma = chanas.search(sigma, precedenceMatrix, end)
+        elif algorithm == "Simulated-Annealing":
+            sigma = simulated_annealing.anneal(sigma, precedenceMatrix, N, rng, timeBudget=remaining())
+        elif algorithm == "Tabu-Search":
+            sigma = tabu_search.tabuSearch(sigma, precedenceMatrix, rng, timeBudget=remaining())
+        elif algorithm == "Opt":
+            sigma = ip.solve(data, params, deadline=end)
+        if sigma is not None:
+            consider(algorithm, sigma)
+
+    sigma, cost, name = best
+    gap = 0 if cost == 0 else max(cost - lowerBound, 0) / cost
+
+    return AggregationResult(sigma, cost, lowerBound, gap, name, time.time() - start)
@@ -9,6 +9,10 @@ def run(data, params):
     """
     Runs borda+ algorithm. Gets average rank for each candidate
     and sorts them.
+
+    If params['top'] = k is given, only the k best average
+    ranks are sorted (see utils.topArgsort); the remaining
+    candidates follow in arbitrary order.
     ------------------------------------
         
     Params
@@ -47,7 +51,11 @@ def run(data, params):
     N = params['N']
     s0 = params['s0']
 
-    sigma = np.argsort(utils.avgRanks(data, n, N))
+    top = params.get('top')
+    if top is None:
+        sigma = np.argsort(utils.avgRanks(data, n, N))
+    else:
+        sigma = utils.topArgsort(utils.avgRanks(data, n, N), top)
     
     # end timer
     time_elapsed = (time.process_time() - start) * 1000
@@ -16,38 +16,68 @@ def run(data, params, sigma=None):
     s0 = params['s0']
 
 
-    # if sigma is not given by previous algorithm, 
+    # if sigma is not given by previous algorithm,
     # make it a random starting permutation
     if sigma is None:
-        sigma = np.random.permutation(n)
+        sigma = np.random.default_rng(params['seed']).permutation(n)
     else:
         sigma = np.array(sigma)
 
-    p_matrix = utils.precedenceMatrix(data,n)
+    p_matrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
+    sigma = search(sigma, p_matrix)
+
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+
+
+
+def search(sigma, p_matrix, deadline=None):
+    """
+    The two passes of the Chanas Algorithm: every candidate is
+    moved to the first earlier position that reduces its
+    disagreements, then the ranking is reversed and the pass
+    is repeated.
+    -------------------------------------
+
+    Params
+
+    'sigma': list, tuple, or np.array of ints
+            The starting full ranking
+
+    'p_matrix': 2D n x n np.array
+            The precedence matrix, see utils.py
+
+    'deadline': float
+            A time.time() value after which the remaining
+            moves are skipped
+    ------------------------------------
+
+    Returns
+        The resulting ranking as a tuple
+    """
     def sort(s):
         for i in range(len(s)):
-            for j in range(i):
-                old_cost = utils.disagreements(s,i,i,p_matrix)
-                curr_cost = utils.disagreements(s,i,j,p_matrix)
-
-                if curr_cost < old_cost:
-                    # retrieve candidate
-                    cand = s[i]
-                    # move candidate from pos i to pos b
-                    s = np.delete(s, i)
-                    s = np.insert(s, j, cand)
-                    break
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            costs = utils.insertionCosts(s, i, p_matrix)
+            better = np.flatnonzero(costs[:i] < costs[i])
+
+            if len(better) > 0:
+                j = better[0]
+                # retrieve candidate
+                cand = s[i]
+                # move candidate from pos i to pos j
+                s = np.delete(s, i)
+                s = np.insert(s, j, cand)
         return s
 
 
     # first pass
-    sigma = sort(sigma)
+    sigma = sort(np.array(sigma))
     # reverse
     sigma = np.flip(sigma)
     # second pass
-    sigma = tuple(sort(sigma))
-                
-    time_elapsed = (time.process_time() - start_time) * 1000
-
-    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+    return tuple(sort(sigma))
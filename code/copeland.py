@@ -8,6 +8,10 @@ def run(data, params):
     This method implements Copeland's voting rule, which 
     orders candidates from most to least pairwise contest 
     wins. 
+
+    If params['top'] = k is given, only the k candidates 
+    with the most wins are sorted (see utils.topArgsort); 
+    the remaining candidates follow in arbitrary order.
     -------------------------------------
 
     Params
@@ -50,27 +54,20 @@ def run(data, params):
 
     # Order candidates by non-decreasing pair-wise contest wins 
     # (ascending order with lexicographic tie-breaking)
-    precedenceMatrix = utils.precedenceMatrix(data, n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
-    # save results to avoid re-computation
-    pairwiseVictores = [-1 for i in range(n)]
+    # If candidates i and j beat each other an equal
+    # number of times, i and j each have a victory
+    pairwiseVictories = utils.pairwiseVictories(precedenceMatrix)
     def totalPairwiseVictories(i):
-        if not pairwiseVictores[i] == -1:
-            return pairwiseVictores[i]
-
-        totalVictories = 0
-        for j in range(n):
-            # If candidates i and j beat each 
-            # other an equal number of times, i and j 
-            # each have a victory
-            if precedenceMatrix[i,j] >= precedenceMatrix[j,i]:
-                totalVictories += 1
-
-        pairwiseVictores[i] = totalVictories
-        return totalVictories
-
-    candidates = [i for i in range(n)]
-    candidates.sort(key=totalPairwiseVictories, reverse=True)
+        return pairwiseVictories[i]
+
+    top = params.get('top')
+    if top is None:
+        candidates = [i for i in range(n)]
+        candidates.sort(key=totalPairwiseVictories, reverse=True)
+    else:
+        candidates = utils.topArgsort(-pairwiseVictories, top).tolist()
 
     sigma = tuple(candidates)
 
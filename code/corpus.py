@@ -0,0 +1,108 @@
+import os
+import glob
+import sim
+import dataset_cache
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+"""
+Parallel loading of a corpus of PrefLib soi files, e.g. the files in
+data/soi. Each file is parsed in a worker process (through the dataset
+cache, see dataset_cache.py), and a file that fails to load does not
+stop the others.
+"""
+
+# n: the number of candidates
+# N: the number of voters
+# data: the top-lists as a Counter object (see sim.py), or only
+#       their SufficientStatistics (see sufficient_statistics.py),
+#       or None if the corpus was only loaded to warm the cache
+Dataset = namedtuple("Dataset", ["n", "N", "data"])
+
+
+def corpusFiles(corpus):
+    """
+    Returns the sorted paths of the files in directory 'corpus',
+    or matching the glob pattern 'corpus'
+    """
+    if os.path.isdir(corpus):
+        paths = [os.path.join(corpus, f) for f in os.listdir(corpus)]
+        return sorted(path for path in paths if os.path.isfile(path))
+    return sorted(glob.glob(corpus))
+
+
+
+def loadCorpus(corpus, workers=None, statisticsOnly=False, cacheDir=dataset_cache.DEFAULT_CACHE_DIR,
+               verbose=True, warmOnly=False):
+    """
+    Loads every file of a corpus across a process pool.
+    -------------------------------------
+
+    Params
+
+    'corpus': str
+            A directory, or a glob pattern matching the files
+
+    'workers': int
+            The number of processes. Defaults to the number of cores.
+
+    'statisticsOnly': bool
+            Whether to stream each file into its SufficientStatistics
+            (see Simulation.streamCSV) rather than parse its top-lists
+
+    'cacheDir': str
+            The dataset cache, or None to parse every file anew
+
+    'verbose': bool
+            Whether to print progress as files finish loading
+
+    'warmOnly': bool
+            Whether to only fill the cache. The workers then send back
+            n and N but not the data, so the corpus is never held in memory.
+    ------------------------------------
+
+    Returns
+
+    'datasets': dict
+            Maps the name of every file that loaded to its Dataset
+
+    'errors': dict
+            Maps the name of every file that failed to load to
+            the exception raised
+    """
+    paths = corpusFiles(corpus)
+    datasets, errors = dict(), dict()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(loadFile, path, statisticsOnly, cacheDir, warmOnly): path for path in paths}
+
+        for done, future in enumerate(as_completed(futures), 1):
+            name = os.path.basename(futures[future])
+            try:
+                datasets[name] = future.result()
+                status = "loaded"
+            except Exception as e:
+                errors[name] = e
+                status = f"failed ({e!r})"
+
+            if verbose:
+                print(f"[{done}/{len(paths)}] {name} {status}")
+
+    return datasets, errors
+
+
+
+def loadFile(path, statisticsOnly, cacheDir, warmOnly=False):
+    """
+    Loads a single file, executed in a worker
+    """
+    simulation = sim.Simulation()
+    simulation.params['cache'] = cacheDir
+
+    if statisticsOnly:
+        data = simulation.streamCSV(path)
+    else:
+        data = simulation.parseCSV(path)
+
+    return Dataset(simulation.params['n'], simulation.params['N'], None if warmOnly else data)
@@ -0,0 +1,234 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+from sufficient_statistics import SufficientStatistics, pack, unpack
+
+"""
+On-disk cache of parsed datasets. Each entry is a directory of .npy
+files holding the packed top-lists (see sufficient_statistics.py) and
+their precedence and rank-frequency matrices, which are memory-mapped
+when loaded. Entries are keyed by the sha256 of a PrefLib file's
+contents, or of the parameters of a seeded synthetic sample.
+
+Storing an entry evicts the entries unused for longer than 'maxAge'
+seconds, then the least recently used ones until the cache holds at
+most 'maxBytes' bytes. Loading an entry counts as using it.
+"""
+
+# Next to this file rather than in the working directory,
+# so that runs from anywhere share one cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+DEFAULT_MAX_BYTES = 1 << 33
+
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+HASH_BLOCK_SIZE = 1 << 20
+
+ARRAYS = ("candidates", "lengths", "weights")
+
+
+def fileKey(path):
+    """
+    Returns the sha256 hex digest of the contents of the file at path
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+
+def paramsKey(**params):
+    """
+    Returns the sha256 hex digest of the given keyword parameters,
+    e.g. those a synthetic sample is generated from. Arrays are keyed
+    by all of their entries, which their repr may elide.
+    """
+    params = {name: value.tolist() if isinstance(value, np.ndarray) else value
+              for name, value in params.items()}
+    return hashlib.sha256(repr(sorted(params.items())).encode()).hexdigest()
+
+
+
+def load(key, cacheDir=DEFAULT_CACHE_DIR, topLists=True):
+    """
+    Loads a cache entry.
+    --------------------------------------
+
+    Params
+
+    'key': str
+            The entry's key, see fileKey and paramsKey
+
+    'cacheDir': str
+            The directory of the cache
+
+    'topLists': bool
+            Whether the top-lists themselves are needed. If not, the
+            entry's statistics are enough.
+    --------------------------------------
+
+    Returns
+        None if there is no such entry (or it lacks the top-lists
+        when they are needed). Otherwise (N, data), where N is the
+        number of voters and data is a TopLists Counter carrying its
+        SufficientStatistics, or just the SufficientStatistics if
+        topLists is False.
+    """
+    entry = os.path.join(cacheDir, key)
+    if not os.path.isdir(entry):
+        return None
+
+    def array(name):
+        return np.load(os.path.join(entry, f"{name}.npy"), mmap_mode='r')
+
+    try:
+        os.utime(entry)
+
+        header = array("header")
+        n, N = int(header[0]), int(header[1])
+
+        statistics = SufficientStatistics(n)
+        statistics.N = float(header[2])
+        statistics.precedence = array("precedence")
+        statistics.rankFrequency = array("rankFrequency")
+
+        if not topLists:
+            return N, statistics
+
+        if not os.path.exists(os.path.join(entry, "candidates.npy")):
+            return None
+
+        return N, unpack(*[array(name) for name in ARRAYS], statistics=statistics)
+    except FileNotFoundError:
+        # evicted by another process meanwhile
+        return None
+
+
+
+def store(key, n, N, data, cacheDir=DEFAULT_CACHE_DIR, maxBytes=DEFAULT_MAX_BYTES, maxAge=DEFAULT_MAX_AGE):
+    """
+    Stores a dataset under key, replacing any existing entry.
+    --------------------------------------
+
+    Params
+
+    'key': str
+            The entry's key, see fileKey and paramsKey
+
+    'n': int
+            The number of candidates
+
+    'N': int
+            The number of voters
+
+    'data': Counter object, packed arrays or SufficientStatistics object
+            The top-lists (see sim.py), as a Counter or as the packed
+            (candidates, lengths, weights) arrays of sufficient_statistics.py,
+            or only their statistics
+
+    'cacheDir': str
+            The directory of the cache
+
+    'maxBytes', 'maxAge': int
+            The limits entries are then evicted by, see evict
+    --------------------------------------
+
+    Returns
+        data's SufficientStatistics
+    """
+    if isinstance(data, SufficientStatistics):
+        statistics, arrays = data, None
+    else:
+        arrays = data if isinstance(data, tuple) else pack(data)
+        statistics = SufficientStatistics(n)
+        statistics.fold(*arrays)
+
+    os.makedirs(cacheDir, exist_ok=True)
+
+    # Written to a temporary directory first, so that readers
+    # never see a partially written entry
+    staging = tempfile.mkdtemp(dir=cacheDir)
+    np.save(os.path.join(staging, "header.npy"), np.array([statistics.n, N, statistics.N]))
+    np.save(os.path.join(staging, "precedence.npy"), statistics.precedence)
+    np.save(os.path.join(staging, "rankFrequency.npy"), statistics.rankFrequency)
+    if arrays is not None:
+        for name, array in zip(ARRAYS, arrays):
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+
+    entry = os.path.join(cacheDir, key)
+    shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        # another process stored the same entry first
+        shutil.rmtree(staging, ignore_errors=True)
+
+    evict(cacheDir, maxBytes, maxAge, keep=key)
+    return statistics
+
+
+
+def evict(cacheDir=DEFAULT_CACHE_DIR, maxBytes=DEFAULT_MAX_BYTES, maxAge=DEFAULT_MAX_AGE, keep=None):
+    """
+    Deletes the entries unused for more than maxAge seconds, then the
+    least recently used entries until the rest take up at most maxBytes.
+    --------------------------------------
+
+    Params
+
+    'cacheDir': str
+            The directory of the cache
+
+    'maxBytes': int
+            The size the cache is reduced to, or None for no limit
+
+    'maxAge': float
+            The seconds an entry may go unused, or None for no limit
+
+    'keep': str
+            The key of an entry that is never evicted, e.g. the one just stored
+    --------------------------------------
+
+    Returns
+        The keys of the evicted entries
+    """
+    if not os.path.isdir(cacheDir):
+        return []
+
+    now = time.time()
+    entries = []
+    for name in os.listdir(cacheDir):
+        entry = os.path.join(cacheDir, name)
+        try:
+            used = os.path.getmtime(entry)
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        # staging directories of stores in progress are only removed once stale
+        if name.startswith("tmp"):
+            if maxAge is not None and now - used > maxAge:
+                shutil.rmtree(entry, ignore_errors=True)
+            continue
+
+        entries.append((used, size, name))
+
+    evicted = []
+    total = sum(size for _, size, _ in entries)
+    for used, size, name in sorted(entries):
+        stale = maxAge is not None and now - used > maxAge
+        if name == keep or not (stale or (maxBytes is not None and total > maxBytes)):
+            continue
+
+        shutil.rmtree(os.path.join(cacheDir, name), ignore_errors=True)
+        evicted.append(name)
+        total -= size
+
+    return evicted
@@ -0,0 +1,315 @@
+import numpy as np
+import scipy.sparse as sparse
+
+from sufficient_statistics import SufficientStatistics, orderedPairs
+
+"""
+Sufficient statistics for short top-lists over many candidates. A
+top-list ranking candidate i puts i before every candidate it leaves
+unranked, so the precedence matrix is determined by two smaller pieces:
+
+    'ranked': ranked[i] is the weight of the top-lists that rank i
+    'before': a sparse matrix, before[i,j] is the weight of the
+              top-lists that rank both i and j, i first
+
+and q[i,j] = ranked[i] - before[j,i] for i != j. A top-list of length
+k costs O(k^2) to fold in rather than the O(k * n) of the dense matrix,
+and memory is about the number of co-ranked pairs rather than n^2.
+"""
+
+# Pairs gathered before they are summed into the sparse matrix. Pairs
+# added with add are also only summed in once this many are pending,
+# or when the matrix is next read, so that each top-list costs O(k^2)
+FLUSH_SIZE = 1 << 22
+
+
+class FactoredPrecedence:
+    """
+    The precedence matrix q (see utils.precedenceMatrix) in factored
+    form. q[i,j], rows q[i], and columns q[:, j] (for an int or an
+    array of ints i and j) are computed on demand, and np.asarray(q)
+    gives the dense matrix for the aggregators that need all of it.
+    """
+
+    def __init__(self, ranked, before):
+        self.ranked = ranked
+        self.before = before.tocsr()
+        # after[i,j] = before[j,i], so that rows of q are rows of after
+        self.after = self.before.T.tocsr()
+
+        n = len(ranked)
+        self.shape = (n, n)
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64)
+
+
+    def __len__(self):
+        return self.shape[0]
+
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            return self.row(key)
+
+        i, j = key
+        if isinstance(i, slice) and i == slice(None):
+            return self.column(j)
+        if np.ndim(i) == 0 and np.ndim(j) == 0:
+            return 0.0 if i == j else self.ranked[i] - self.before[j, i]
+        if np.ndim(j) == 0:
+            return self.column(j)[i]
+        return self.row(i)[..., j]
+
+
+    def row(self, i):
+        """
+        q[i], or the rows q[i] stacked if i is an array
+        """
+        i = np.asarray(i)
+        rows = self.ranked[i.ravel(), None] - self.after[i.ravel()].toarray()
+        rows[np.arange(i.size), i.ravel()] = 0
+        return rows.reshape(i.shape + (self.shape[1],))
+
+
+    def column(self, j):
+        """
+        q[:, j], or the columns q[:, j] side by side if j is an array
+        """
+        j = np.asarray(j)
+        columns = self.ranked[:, None] - self.before[j.ravel()].toarray().T
+        columns[j.ravel(), np.arange(j.size)] = 0
+        return columns.reshape((self.shape[0],) + j.shape)
+
+
+    def __array__(self, dtype=None, copy=None):
+        q = self.ranked[:, None] - self.after.toarray()
+        np.fill_diagonal(q, 0)
+        return q if dtype is None else q.astype(dtype)
+
+
+    def disagreements(self, sigma):
+        """
+        The total weight of the disagreements of the full ranking sigma
+        with the top-lists, in O(n + number of co-ranked pairs).
+
+        For a before b in sigma, the q[b,a] = ranked[b] - before[a,b]
+        voters preferring b disagree, and the candidates before b are
+        exactly its position in sigma.
+        """
+        position = np.empty(self.shape[0], dtype=np.int64)
+        position[np.asarray(sigma)] = np.arange(self.shape[0])
+
+        pairs = self.before.tocoo()
+        agreeing = position[pairs.row] < position[pairs.col]
+        return np.dot(self.ranked, position) - np.sum(pairs.data[agreeing])
+
+
+    def lowerBound(self):
+        """
+        The sum of min(q[a,b], q[b,a]) over all pairs of candidates
+        (see utils.pairwiseLowerBound), in O(n log n + number of
+        co-ranked pairs). Pairs never ranked together contribute
+        min(ranked[a], ranked[b]), and the co-ranked ones are corrected.
+        """
+        n = self.shape[0]
+        ranked = np.sort(self.ranked)
+        bound = np.dot(ranked, np.arange(n - 1, -1, -1))
+
+        # each unordered co-ranked pair once, as (a, b) with a < b
+        pairs = (self.before + self.after).tocoo()
+        a, b = pairs.row[pairs.row < pairs.col], pairs.col[pairs.row < pairs.col]
+
+        qab = self.ranked[a] - np.asarray(self.before[b, a]).ravel()
+        qba = self.ranked[b] - np.asarray(self.before[a, b]).ravel()
+        bound += np.sum(np.minimum(qab, qba) - np.minimum(self.ranked[a], self.ranked[b]))
+        return bound
+
+
+
+class FactoredStatistics(SufficientStatistics):
+    """
+    SufficientStatistics (see sufficient_statistics.py) holding the
+    precedence matrix as a FactoredPrecedence, and the rank frequencies
+    only for the ranks some top-list reaches. Accepted wherever
+    SufficientStatistics are.
+    --------------------------------------
+
+    Attributes
+
+    'ranked': (n,) np.array
+            ranked[i] is the weight of the top-lists that rank i
+
+    'before': n x n scipy.sparse matrix
+            before[i,j] is the weight of the top-lists ranking i before j.
+            Pending pairs are summed in when it is read.
+
+    'rankCounts': 2D n x k np.array
+            The first k columns of the rank-frequency matrix, where k is
+            the length of the longest top-list
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.N = 0
+        self.ranked = np.zeros(n)
+        self.before = sparse.csr_matrix((n, n))
+        self.rankCounts = np.zeros((n, 0))
+
+
+    @property
+    def before(self):
+        self.flush()
+        return self.coRanked
+
+
+    @before.setter
+    def before(self, before):
+        self.coRanked = before
+        self.pending, self.pendingSize = [], 0
+        self.cachedPrecedence = None
+
+
+    @property
+    def precedence(self):
+        # built once per change, as it transposes before
+        if self.cachedPrecedence is None:
+            self.cachedPrecedence = FactoredPrecedence(self.ranked, self.before)
+        return self.cachedPrecedence
+
+
+    @property
+    def rankFrequency(self):
+        rankFrequency = np.zeros((self.n, self.n))
+        rankFrequency[:, :self.rankCounts.shape[1]] = self.rankCounts
+        return rankFrequency
+
+
+    def reserveRanks(self, k):
+        if k > self.rankCounts.shape[1]:
+            self.rankCounts = np.pad(self.rankCounts, ((0, 0), (0, k - self.rankCounts.shape[1])))
+
+
+    def fold(self, candidates, lengths, weights):
+        """
+        Adds a batch of packed top-lists to the statistics,
+        see SufficientStatistics.fold
+        """
+        n = self.n
+        candidates = np.asarray(candidates, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        self.N += np.sum(weights)
+        self.cachedPrecedence = None
+        if len(candidates) == 0:
+            return
+
+        topList = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        rank = np.arange(len(candidates)) - starts[topList]
+        weight = weights[topList]
+
+        k = int(np.max(lengths))
+        self.reserveRanks(k)
+        # in place, as the rank counts of a long top-list span many columns
+        np.add.at(self.rankCounts, (candidates, rank), weight)
+        self.ranked += np.bincount(candidates, weight, n)
+
+        pairs, pending = [], 0
+        for batch in orderedPairs(candidates, lengths, weights):
+            pairs.append(batch)
+            pending += len(batch[0])
+
+            if pending >= FLUSH_SIZE:
+                self.addPairs(pairs)
+                pairs, pending = [], 0
+        if pending > 0:
+            self.addPairs(pairs)
+
+
+    def addPairs(self, pairs):
+        """
+        Queues (first, second, weights) batches of pairs to be added to before
+        """
+        self.cachedPrecedence = None
+        self.pending.extend(pairs)
+        self.pendingSize += sum(len(batch[0]) for batch in pairs)
+        if self.pendingSize >= FLUSH_SIZE:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Sums the pending pairs into before
+        """
+        if self.pendingSize > 0:
+            first, second, weights = (np.concatenate(arrays) for arrays in zip(*self.pending))
+            self.coRanked = self.coRanked + sparse.csr_matrix((weights, (first, second)), shape=(self.n, self.n))
+            self.pending, self.pendingSize = [], 0
+
+
+    def add(self, topList, weight=1):
+        """
+        Adds a single top-list with multiplicity weight.
+        A negative weight removes it.
+        """
+        topList = np.asarray(topList, dtype=np.int64)
+
+        self.N += weight
+        self.cachedPrecedence = None
+        self.reserveRanks(len(topList))
+        self.rankCounts[topList, np.arange(len(topList))] += weight
+        self.ranked[topList] += weight
+
+        first, second = np.triu_indices(len(topList), 1)
+        if len(first) > 0:
+            self.addPairs([(topList[first], topList[second], np.full(len(first), float(weight)))])
+
+
+    def copy(self):
+        statistics = FactoredStatistics(self.n)
+        statistics.N = self.N
+        statistics.ranked = np.array(self.ranked)
+        statistics.before = self.before.copy()
+        statistics.rankCounts = np.array(self.rankCounts)
+        return statistics
+
+
+    def save(self, path):
+        """
+        Writes the statistics to an .npz file
+        """
+        before = self.before.tocsr()
+        np.savez(path, n=self.n, N=self.N, ranked=self.ranked, rankCounts=self.rankCounts,
+                 data=before.data, indices=before.indices, indptr=before.indptr)
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads statistics written by save
+        """
+        with np.load(path) as f:
+            n = int(f['n'])
+            statistics = cls(n)
+            statistics.N = f['N'].item()
+            statistics.ranked = f['ranked']
+            statistics.rankCounts = f['rankCounts']
+            statistics.before = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=(n, n))
+        return statistics
+
+
+    def merge(self, other):
+        """
+        Adds the factored statistics of another dataset
+        over the same candidates
+        """
+        if other.n != self.n:
+            raise ValueError(f"cannot merge statistics over {other.n} and {self.n} candidates")
+
+        self.N += other.N
+        self.ranked = self.ranked + other.ranked
+        self.before = self.before + other.before
+        self.reserveRanks(other.rankCounts.shape[1])
+        self.rankCounts[:, :other.rankCounts.shape[1]] += other.rankCounts
+        return self
@@ -7,6 +7,10 @@ from scipy.optimize import linear_sum_assignment
 
 ALGORITHM_NAME = "FootRule+"
 
+# Rows of the cost matrix computed at a time, which bounds
+# the size of the integer prefix sums
+ROW_BLOCK = 256
+
 def run(data, params):
     """
     This method implements the foorule+ algorithm by considering
@@ -101,20 +105,30 @@ def createCostMatrix(data, n, N):
                for the columns
         
     """
-    # gets n by n matrix of occurances for each alternative for each rank
-    p = utils.alternativeRankFrequency(data,n) / N
-    
-    # creates empty n by n cost matrix
-    # should not be any empty entries by end of function
-    arr = np.empty((n,n))
+    # gets n by n matrix of occurances for each alternative for each rank,
+    # as compact integer counts that are only normalized by N at the end
+    p = utils.alternativeRankFrequency(data, n, compact=True)
 
-    # follows rule above and assigns cost C(i,j)
-    for i in range(n):          # for each alternative
-        for j in range(n):      # for each rank
-            summ = 0                # start sum
-            for r in range(j):
-                summ += (j-r) * p[i, r]     # following algorithm formula
-            arr[i,j] = summ
+    # sums of counts are accumulated in a wider type, exact for integers
+    accumulator = np.int64 if np.issubdtype(p.dtype, np.integer) else np.float64
+    ranks = np.arange(n, dtype=accumulator)
+
+    # C(i,j) = j * sum_{r<j} p(i,r) - sum_{r<j} r * p(i,r), both sums
+    # being prefix sums over the ranks before j, a block of rows at a time
+    arr = np.empty((n,n))
+    before = np.zeros((min(ROW_BLOCK, n), n), dtype=accumulator)
+    weightedBefore = np.zeros_like(before)
+    for start in range(0, n, ROW_BLOCK):
+        block = p[start:start + ROW_BLOCK]
+        rows = len(block)
+
+        np.cumsum(block[:, :-1], axis=1, dtype=accumulator, out=before[:rows, 1:])
+        np.multiply(block[:, :-1], ranks[:-1], out=weightedBefore[:rows, 1:])
+        np.cumsum(weightedBefore[:rows, 1:], axis=1, out=weightedBefore[:rows, 1:])
+
+        before[:rows] *= ranks
+        before[:rows] -= weightedBefore[:rows]
+        np.divide(before[:rows], N, out=arr[start:start + rows])
 
     return arr
 
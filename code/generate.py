@@ -1,13 +1,91 @@
+import os
 import mallows_kendall as mk
 import numpy as np
 import collections
+import sharded_statistics
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from sufficient_statistics import SufficientStatistics
+
+# Changes whenever the samples drawn for a given seed change, so that
+# cached samples (see dataset_cache.py) are not mistaken for new ones
+SAMPLER_VERSION = 3
+
+# The top-lists drawn by one task. Blocks are fixed in size rather than
+# one per worker, so that the sample does not depend on the number of workers
+BLOCK_SIZE = 1 << 16
+
+def sampleBlock(n,k,m,theta,phi,s0,seed):
+    """Draws m top-k-lists from the stream seed, returning the distinct
+    lists and how many times each was drawn
+    """
+    lists = mk.sampling_top_k_lists(m, n, k, theta, phi, s0, seed)
+    return np.unique(lists, axis=0, return_counts=True)
+
+def sampleTasks(n,k_distribution,theta=None,phi=None,s0=None,seed=None):
+    """Splits the top-lists of k_distribution into blocks of at most
+    BLOCK_SIZE lists of one length, returning the sampleBlock arguments
+    of every block. Block b of the g-th shortest length draws from the
+    stream (g, b) spawned from seed.
+    """
+    root = np.random.SeedSequence(seed)
+    tasks = []
+    for group, k in enumerate(sorted(k_distribution)):
+        freq = int(k_distribution[k])
+        for block, start in enumerate(range(0, freq, BLOCK_SIZE)):
+            stream = np.random.SeedSequence(root.entropy, spawn_key=(group, block))
+            tasks.append((n, k, min(BLOCK_SIZE, freq - start), theta, phi, s0, stream))
+    return tasks
+
+def foldBlocks(statistics,tasks):
+    """Draws the blocks of tasks one at a time, folding each into statistics"""
+    for task in tasks:
+        lists, counts = sampleBlock(*task)
+        statistics.fold(lists.ravel(), np.full(len(lists), task[1]), counts)
+    return statistics
+
+def foldShard(slot,tasks):
+    """sharded_statistics.build task folding the blocks of tasks into slot"""
+    statistics = foldBlocks(SufficientStatistics(tasks[0][0]), tasks)
+    sharded_statistics.write(slot, statistics)
+
+def sampleStatistics(n,k_distribution,theta=None,phi=None,s0=None,seed=None,workers=None):
+    """This function draws the same sample as MallowsSample with these
+    parameters, but keeps only its precedence and rank-frequency matrices.
+    Each block of top-lists is folded into them and discarded, so memory
+    is O(n^2 * workers) however many lists are drawn. The blocks are split
+    between the workers, which fold them into shared-memory slots that are
+    then summed (see sharded_statistics.py).
+        Parameters
+        ----------
+        n, k_distribution, theta, phi, s0, seed, workers:
+            See MallowsSample.topListSample
+        Returns
+        -------
+        SufficientStatistics
+            The statistics of the sample, accepted by every aggregator
+            in place of its Counter
+    """
+    tasks = sampleTasks(n,k_distribution,theta,phi,s0,seed)
+
+    workers = min(workers or os.cpu_count(), len(tasks))
+    if workers <= 1:
+        return foldBlocks(SufficientStatistics(n), tasks)
+
+    # consecutive blocks per worker, so each slot is written once
+    bounds = np.linspace(0, len(tasks), workers + 1).astype(np.int64).tolist()
+    shards = [(foldShard, (tasks[start:end],)) for start, end in zip(bounds[:-1], bounds[1:])]
+    return sharded_statistics.build(n, shards, workers)
+
 
 class MallowsSample:
-    def topListSample(self,n,k_distribution,theta=None,phi=None,s0=None,seed=None):
+    def topListSample(self,n,k_distribution,theta=None,phi=None,s0=None,seed=None,workers=None):
         """This function generates a single sample according
         to Mallows Models adapted to top-k rankings given a parameter of dispersion
-        (theta or phi), where the values of k are controlled by k_distribution
+        (theta or phi), where the values of k are controlled by k_distribution.
+        Every length, and every block of BLOCK_SIZE lists of that length,
+        is drawn from its own stream spawned from seed, so the blocks can be
+        drawn in parallel and the sample is the same for any number of workers.
             Parameters
             ----------
             n: int
@@ -25,31 +103,51 @@ class MallowsSample:
                 The dispersion parameter phi
             s0: ndarray
                 The consensus ranking. The identity ranking by default.
+            seed: int
+                The root of the streams. Defaults to fresh entropy.
+            workers: int
+                The number of processes drawing blocks. Defaults to the
+                number of cores; a single block is always drawn in process.
             Returns
             -------
-            list
-                The top-lists generated, where each top-list is a tuple
+            dict {int : (ndarray, ndarray)}
+                For each length k, the distinct top-k-lists generated, one per
+                row, and how many times each was generated
+        """
+        # mallows_kendall.py generates each top-list as a row of
+        # candidates, in which (0,1,2) indicates that candidate 0
+        # precedes canddiates 1 and 2, candidate 1 precedes candidate 2, etc.
+        tasks = sampleTasks(n,k_distribution,theta,phi,s0,seed)
+        lengths = [task[1] for task in tasks]
+
+        workers = workers or os.cpu_count()
+        if workers == 1 or len(tasks) <= 1:
+            blocks = [sampleBlock(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = list(pool.map(sampleBlock, *zip(*tasks)))
+
+        # merge the blocks of every length in block order
+        topLists = dict()
+        for k in sorted(set(lengths)):
+            lists = np.concatenate([block[0] for length, block in zip(lengths, blocks) if length == k])
+            counts = np.concatenate([block[1] for length, block in zip(lengths, blocks) if length == k])
+            lists, inverse = np.unique(lists, axis=0, return_inverse=True)
+            topLists[k] = lists, np.bincount(inverse.reshape(-1), counts, len(lists)).astype(np.int64)
+
+        return topLists
+
+    def packed(self):
+        """Returns the sample as packed (candidates, lengths, weights)
+        arrays, see sufficient_statistics.py
         """
-        # mallows_kandall.py generates top-lists in dictionary format 
-        # (see 'Intro to top k ranks and MM.ipynb')
-        #
-        # This converts top-lists to a format in which 
-        # (0,1,2) indicates that candidate 0 precedes 
-        # canddiates 1 and 2, candidate 1 precedes candidate 2, etc.
-        allLists = list()
-        for k, freq in k_distribution.items():
-            for ranking in mk.sampling_top_k_rankings(freq, n, k, theta, phi, s0, seed):
-                # -1 is an invalid candidate label, so 
-                # if -1s exist in our data, this is clearly 
-                # an error / bug
-                formattedRanking = [-1 for i in range(k)]
-                for candidate in range(len(ranking)):
-                    if not np.isnan(ranking[candidate]):
-                        position = int(ranking[candidate])
-                        formattedRanking[position] = candidate
-                allLists.append(tuple(formattedRanking))
-
-        return allLists
+        lengths = [np.full(len(lists), k, dtype=np.int64) for k, (lists, _) in self.topLists.items()]
+        candidates = [lists.ravel() for lists, _ in self.topLists.values()]
+        weights = [counts for _, counts in self.topLists.values()]
+        if len(lengths) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return (np.concatenate(candidates).astype(np.int64), np.concatenate(lengths),
+                np.concatenate(weights).astype(np.float64))
 
     """This class represents a single sample generated from a
     Mallows Models adapted to top-k rankings given a parameter of dispersion
@@ -72,14 +170,31 @@ class MallowsSample:
             The dispersion parameter phi
         s0: ndarray
             The consensus ranking. The identity ranking by default.
+        seed: int
+            The root of the random streams, see topListSample
+        workers: int
+            The number of processes drawing the sample, see topListSample
+        statisticsOnly: bool
+            Whether to keep only the sample's SufficientStatistics, in
+            self.statistics, rather than its top-lists (see sampleStatistics).
+            self.topLists and self.sample are then None.
     """
-    def __init__(self,n,k_distribution,theta=None,phi=None,s0=None,seed=None):
+    def __init__(self,n,k_distribution,theta=None,phi=None,s0=None,seed=None,workers=None,
+                 statisticsOnly=False):
         self.n = n
         self.theta, self.phi = mk.check_theta_phi(theta, phi)
         self.s0 = np.array(range(n)) if s0 is None else s0
-        self.sample = self.topListSample(n,k_distribution,theta,phi,s0,seed)
-        self.m = len(self.sample)
-        self.sample = Counter(self.sample)
+        if statisticsOnly:
+            self.statistics = sampleStatistics(n,k_distribution,theta,phi,s0,seed,workers)
+            self.m = int(self.statistics.N)
+            self.topLists = self.sample = None
+            return
+
+        self.topLists = self.topListSample(n,k_distribution,theta,phi,s0,seed,workers)
+        self.m = int(sum(counts.sum() for _, counts in self.topLists.values()))
+        self.sample = Counter()
+        for lists, counts in self.topLists.values():
+            self.sample.update(dict(zip(map(tuple, lists.tolist()), counts.tolist())))
 
     sampleType = "Mallows"
 
@@ -120,16 +235,19 @@ class MallowsSampleTopK(MallowsSample):
     number of known positions of items for the rankings.
     s0: ndarray
     The consensus ranking. The identity ranking by default.
+    statisticsOnly: bool
+    Whether to keep only the sample's statistics, see MallowsSample
     Returns
     -------
     ndarray
     The top-lists generated
     """
-    def __init__(self,m,n,k,theta=None,phi=None,s0=None,seed=None):
+    def __init__(self,m,n,k,theta=None,phi=None,s0=None,seed=None,workers=None,
+                 statisticsOnly=False):
         self.m = m
         self.k = k
         k_distribution = {k : m}
-        super().__init__(n,k_distribution,theta,phi,s0,seed)
+        super().__init__(n,k_distribution,theta,phi,s0,seed,workers,statisticsOnly)
 
     def label(self):
         return super().label() + f"_k-{self.k}"
@@ -137,10 +255,14 @@ class MallowsSampleTopK(MallowsSample):
 class MallowsSamplePoisson(MallowsSample):
     sampleType = "Mallows_Poisson"
 
-    def poissonSample(self,m,lda,seed=None,lower = 0,upper = float('inf')):
-        """Returns m values drawn from a Poisson distribution on lambda for
-            which all values are in [lower, upper] through repeated sampling.
-            Not guaranteed to terminate.
+    def poissonCounts(self,m,lda,seed=None,lower=0,upper=float('inf')):
+        """Returns a Counter of m values drawn from a Poisson distribution
+            on lambda for which all values are in [lower, upper] through
+            repeated sampling. Not guaranteed to terminate.
+            Each attempt draws sampleSize values, BLOCK_SIZE at a time so
+            that memory does not grow with m, and keeps the first m of them
+            in [lower, upper]. If fewer than m are, the attempt is discarded
+            and the next one draws twice as many values.
             Parameters
             ----------
             m: int
@@ -154,14 +276,22 @@ class MallowsSamplePoisson(MallowsSample):
                 Upperbound of the sampled values.
         """
         rng = np.random.default_rng(seed)
-        # Samples are drawn repeatedly until enough values
-        # reside in [lower,upper]
         sampleSize = m
         while True:
-            sample = rng.poisson(lda, sampleSize)
-            sample = sample[(sample <= upper) & (sample >= lower)]
-            if len(sample) >= m:
-                return sample[:m]
+            counts, accepted, drawn = Counter(), 0, 0
+            while drawn < sampleSize and accepted < m:
+                size = min(BLOCK_SIZE, sampleSize - drawn)
+                block = rng.poisson(lda, size)
+                drawn += size
+
+                # only the first m values in [lower,upper] are kept
+                block = block[(block <= upper) & (block >= lower)][:m - accepted]
+                values, freq = np.unique(block, return_counts=True)
+                counts.update(dict(zip(values.tolist(), freq.tolist())))
+                accepted += len(block)
+
+            if accepted >= m:
+                return counts
             # Double the number of values sampled each time to
             # increase the chance that sufficient values lay in [lower,upper]
             sampleSize *= 2
@@ -196,12 +326,17 @@ class MallowsSamplePoisson(MallowsSample):
         seed: int
             seed used for random number generation. Defaults to system-time 
             if none is provided.
+        workers: int
+            The number of processes drawing the sample, see topListSample
+        statisticsOnly: bool
+            Whether to keep only the sample's statistics, see MallowsSample
     """
-    def __init__(self,m,n,lda,theta=None,phi=None,s0=None,seed=None):
+    def __init__(self,m,n,lda,theta=None,phi=None,s0=None,seed=None,workers=None,
+                 statisticsOnly=False):
         self.m = m
         self.lda = lda
-        k_distribution = Counter(self.poissonSample(m,lda,seed,1,n))
-        super().__init__(n,k_distribution,theta,phi,s0,seed)
+        k_distribution = self.poissonCounts(m,lda,seed,1,n)
+        super().__init__(n,k_distribution,theta,phi,s0,seed,workers,statisticsOnly)
 
     def label(self):
         return super().label() + f"_lambda-{self.lda}"
@@ -0,0 +1,138 @@
+import time
+import utils
+import numpy as np
+import localsearch, chanas
+
+from anytime import AggregationResult
+from sufficient_statistics import SufficientStatistics
+
+"""
+Aggregation of continuously arriving top-lists. IncrementalAggregator
+keeps the sufficient statistics of the current electorate up to date as
+top-lists are added and removed, and re-aggregates on demand starting
+from the previous ranking, so each refresh costs about as much as the
+electorate changed rather than a run from scratch.
+"""
+
+ALGORITHMS = ("Local-Search", "Chanas")
+
+
+class IncrementalAggregator:
+    """
+    Aggregates a changing set of top-lists over n candidates.
+    -------------------------------------
+
+    Params
+
+    'n': int
+         The number of candidates
+
+    'algorithm': str
+         The improvement step, one of ALGORITHMS
+
+    'data': Counter object or SufficientStatistics object
+         The initial top-lists (see sim.py), if any
+
+    'seed': int
+         Seed of the order in which Local-Search visits positions
+    """
+
+    def __init__(self, n, algorithm="Local-Search", data=None, seed=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"{algorithm} is not one of {ALGORITHMS}")
+
+        self.n = n
+        self.algorithm = algorithm
+        self.rng = np.random.default_rng(seed)
+        self.sigma = None
+
+        if data is None:
+            self.statistics = SufficientStatistics(n)
+        elif isinstance(data, SufficientStatistics):
+            self.statistics = data.copy()
+        else:
+            self.statistics = SufficientStatistics.fromCounter(data, n)
+
+
+    @property
+    def N(self):
+        return self.statistics.N
+
+
+    @property
+    def precedenceMatrix(self):
+        return self.statistics.precedence
+
+
+    @property
+    def rankFrequency(self):
+        return self.statistics.rankFrequency
+
+
+    @property
+    def scores(self):
+        """
+        The fraction of voters ranking each candidate, see utils.scores
+        """
+        if self.N == 0:
+            return np.zeros(self.n)
+        return np.sum(self.rankFrequency, axis=1) / self.N
+
+
+    def add(self, topList, weight=1):
+        """
+        Adds a top-list (a tuple of candidates) with multiplicity weight
+        """
+        self.statistics.add(topList, weight)
+
+
+    def remove(self, topList, weight=1):
+        """
+        Removes weight copies of a top-list previously added
+        """
+        self.statistics.add(topList, -weight)
+
+
+    def aggregate(self, deadline=None):
+        """
+        Improves the previous ranking (or, at first, the Borda+ ranking)
+        against the current top-lists.
+        -------------------------------------
+
+        Params
+
+        'deadline': float
+              Wall-clock seconds, counted from the call, after which
+              the improvement step stops. No deadline if not provided.
+        ------------------------------------
+
+        Returns
+
+        An AggregationResult (see anytime.py)
+        """
+        start = time.time()
+        end = None if deadline is None else start + deadline
+
+        n, N = self.n, self.N
+        q = self.precedenceMatrix
+
+        if self.sigma is None:
+            if N > 0:
+                self.sigma = tuple(np.argsort(utils.avgRanks(self.statistics, n, N)).tolist())
+            else:
+                self.sigma = tuple(range(n))
+
+        if N > 0:
+            if self.algorithm == "Local-Search":
+                sigma = localsearch.search(self.sigma, q, self.rng, end)
+            else:
+                sigma = chanas.search(self.sigma, q, end)
+            self.sigma = tuple(int(i) for i in sigma)
+
+            cost = utils.precedenceKendallTauDistance(self.sigma, q, N)
+            lowerBound = utils.pairwiseLowerBound(q, N)
+        else:
+            cost, lowerBound = 0, 0
+        gap = 0 if cost == 0 else max(cost - lowerBound, 0) / cost
+
+        return AggregationResult(self.sigma, cost, lowerBound, gap, self.algorithm, time.time() - start)
@@ -9,6 +9,10 @@ def run(data, params):
     During sorting, candidate a > candidate b iff 
     a precedes b more often than the reverse
     in the top-lists provided in data.
+
+    If params['top'] = k is given, only the first k
+    positions are kept sorted; the remaining candidates
+    follow in arbitrary order.
     -------------------------------------
 
     Params
@@ -51,14 +55,24 @@ def run(data, params):
 
     # Order candidates by non-decreasing pair-wise contest wins 
     # (ascending order with lexicographic tie-breaking)
-    precedenceMatrix = utils.precedenceMatrix(data, n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
     # Credits to Sayan-Paul for starter code for insertion sort
     # See: https://github.com/Sayan-Paul/Sort-Library-in-Python/blob/master/sortlib.py
+    #
+    # If params['top'] = k is given, only ar[:k] is kept sorted: each
+    # new element is swapped into position k and inserted into the
+    # head, and whatever is left at position k stays in the tail
+    top = params.get('top')
+    if top is None:
+        top = n
+
     def insertion(ar):
         for i in range(len(ar)):
-            j=i-1
-            ch=i
+            if i > top:
+                ar[i],ar[top]=ar[top],ar[i]
+            j=min(i,top)-1
+            ch=min(i,top)
             while j>=0:
                 if precedenceMatrix[ar[ch],ar[j]] > precedenceMatrix[ar[j],ar[ch]]:
                     ar[ch],ar[j]=ar[j],ar[ch]
@@ -1,11 +1,16 @@
 import utils
+import time
 import pulp as plp 
 import itertools
 import math
+import numpy as np
 
 ALGORITHM_NAME = "OPTIMAL_SOLUTION"
 
-def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
+# Transitivity constraints added between checks of the deadline, see buildProgram
+DEADLINE_CHECK_INTERVAL = 1024
+
+def solve(data, params, lpRelaxation=False, baseList=None, permBound=None, timeLimit=None, deadline=None):
     """
     Outputs a full-ranking.
     
@@ -58,6 +63,15 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
 
             If not provided, all possible full-rankings are 
             considered.
+
+    'timeLimit': float
+            Seconds after which the solver stops and the best 
+            solution found so far is used. No limit if not provided.
+
+    'deadline': float
+            A time.time() value by which solve returns. Building
+            the program stops once it passes, and the solver's time
+            limit is whatever remains once the program is built.
             
     ------------------------------------
 
@@ -65,7 +79,8 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
 
     sigma: tuple
             The optimal full-ranking, given 
-            the provided constraints
+            the provided constraints. None if the deadline
+            passed before the program was built.
 
     """
     # 'n' is the number of candidates, also the number of ranks
@@ -86,9 +101,6 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
     # Otherwise, Pulp will generate warnings
     separator = "_"
 
-    programType = "Linear" if lpRelaxation else "Integer"
-    model = plp.LpProblem(f"Kemeny{separator}{programType}{separator}Program")
-
     indices = set(baseList[:permBound])
     # Remove unranked candidates since they contribute nothing to the cost
     unrankedCandidates = set(utils.unrankedAlternatives(data, n ,N))
@@ -105,9 +117,6 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
         indices.extend(fixedElements)
         return tuple(indices)
     
-    indexPermutations = tuple(pair for pair in itertools.permutations(indices, r=2))
-    indexCombinations = tuple(pair for pair in itertools.combinations(indices, r=2))
-    
     # Overview: First, compute the top-permBound-list that has the minimum average kendall-Tau 
     # distance to the top-lists in data using integer-programming. Second, append the 
     # unpermutable portion of baseList onto the end of the top-permBound-list from step one.
@@ -118,6 +127,147 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
     # label >= permBound is considered.
     precedenceMatrix = utils.precedenceMatrix(data, n)
 
+    model, x_vars = buildProgram(precedenceMatrix, indices, lpRelaxation, separator, deadline)
+    if model is None:
+        return None
+
+    if deadline is not None:
+        remaining = max(deadline - time.time(), 0)
+        timeLimit = remaining if timeLimit is None else min(timeLimit, remaining)
+
+    # msg = False suppresses log information
+    model.solve(plp.GUROBI(msg=False, timeLimit=timeLimit))
+
+    # Dictionary to track how many candidates a given candidate precedes
+    precedenceFreqency = {i:0 for i in indices}
+
+    for var in model.variables():
+        # Process the string name of variable
+        name = var.name
+        candidateLabels = name.split(separator)
+        i = int(candidateLabels[0])
+
+        value = var.varValue
+
+        # Update precedence frequency if i precedes a candidate j
+        #
+        # Comparisons handle the case that linear programming was used
+        #
+        # value is None if a time limit stopped the solver before it 
+        # found any solution
+        if value is not None and value >= .5:
+            precedenceFreqency[i] += 1
+
+    # Sort candidates starting with those that precede the most candidates
+    sigma = [candidate for candidate, _ in precedenceFreqency.items()]
+    sigma.sort(key=lambda num : precedenceFreqency[num], reverse=True)
+
+    # Add back the unranked candidates
+    # that were in the permutable portion 
+    # of baseList
+    sigma.extend(permutableUnrankedCandidates)
+
+    # Append the fixed portion of baseList onto 
+    # the optimal sigma, assuming some items of 
+    # the baseList are fixed
+    if permBound < n:
+        sigma.extend(fixedElements)
+
+    # Convert to tuple for consistency
+    return tuple(sigma)
+
+
+def relaxedPrecedence(data, params):
+    """
+    Solves the linear-programming relaxation over all candidates
+    and returns its fractional solution as a matrix, rather than
+    rounding it to a full-ranking as solve does.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            See solve
+
+    'params': dict
+            See solve
+    ------------------------------------
+
+    Returns
+
+    x: 2D n x n np.array
+            x[i,j] is the LP value of candidate i preceding
+            candidate j. Candidates never ranked are placed after
+            all ranked candidates (x = 1 / x = 0), and pairs of
+            them are left undecided (x = .5).
+
+    """
+    n = params['n']
+    N = params['N']
+
+    unrankedCandidates = list(utils.unrankedAlternatives(data, n, N))
+    indices = [i for i in range(n) if i not in unrankedCandidates]
+
+    x = np.full((n,n), .5)
+    x[np.ix_(indices, unrankedCandidates)] = 1
+    x[np.ix_(unrankedCandidates, indices)] = 0
+
+    if len(indices) <= 1:
+        return x
+
+    precedenceMatrix = utils.precedenceMatrix(data, n)
+    model, x_vars = buildProgram(precedenceMatrix, indices, lpRelaxation=True)
+
+    # msg = False suppresses log information
+    model.solve(plp.GUROBI(msg=False))
+
+    for (i,j), var in x_vars.items():
+        x[i,j] = var.varValue
+
+    return x
+
+
+def buildProgram(precedenceMatrix, indices, lpRelaxation, separator="_", deadline=None):
+    """
+    Builds the Kemeny program over the candidates in 'indices'. 
+    Variable x_{i,j} is named f'{i}{separator}{j}' and is 1 when 
+    candidate i precedes candidate j.
+    -------------------------------------
+
+    Params
+
+    'precedenceMatrix': 2D n x n np.array
+            See utils.py
+
+    'indices': list of ints
+            The candidates to be ordered. Must contain at least two.
+
+    'lpRelaxation': boolean
+            True if the variables are continuous in [0,1], 
+            False if they are integers.
+
+    'deadline': float
+            A time.time() value. The O(n^3) transitivity constraints
+            are abandoned once it passes, checking it every
+            DEADLINE_CHECK_INTERVAL constraints.
+    ------------------------------------
+
+    Returns 
+
+    model: plp.LpProblem
+            The unsolved program, or None (as is x_vars)
+            if the deadline passed while building it
+
+    x_vars: dict {(int, int) : plp.LpVariable}
+            The variable x_{i,j} for every ordered pair (i,j)
+
+    """
+    programType = "Linear" if lpRelaxation else "Integer"
+    model = plp.LpProblem(f"Kemeny{separator}{programType}{separator}Program")
+
+    indexPermutations = tuple(pair for pair in itertools.permutations(indices, r=2))
+    indexCombinations = tuple(pair for pair in itertools.combinations(indices, r=2))
+    
     # x_{i,j} is a binary variable since the full-ranking either places 
     # candidate i before candidate j, or it does not
 
@@ -149,7 +299,9 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
     # Uses permutations because enforicing transitivity requires considering 
     # different potential orderings of i, j, and k relative to each other
     if len(indices) >= 3:
-        for i,j,k in itertools.permutations(indices, r=3):
+        for count, (i,j,k) in enumerate(itertools.permutations(indices, r=3)):
+            if deadline is not None and count % DEADLINE_CHECK_INTERVAL == 0 and time.time() >= deadline:
+                return None, None
             model.addConstraint(plp.LpConstraint(
                                 e=plp.LpAffineExpression(
                                     [(x_vars[(i,j)], 1), (x_vars[(j,k)], 1), (x_vars[(k,i)], 1)]),
@@ -174,40 +326,4 @@ def solve(data, params, lpRelaxation=False, baseList=None, permBound=None):
     model.sense = plp.LpMinimize
     model.setObjective(kendall_dist)
 
-    # msg = False suppresses log information
-    model.solve(plp.GUROBI(msg=False))
-
-    # Dictionary to track how many candidates a given candidate precedes
-    precedenceFreqency = {i:0 for i in indices}
-
-    for var in model.variables():
-        # Process the string name of variable
-        name = var.name
-        candidateLabels = name.split(separator)
-        i = int(candidateLabels[0])
-
-        value = var.varValue
-
-        # Update precedence frequency if i precedes a candidate j
-        #
-        # Comparisons handle the case that linear programming was used
-        if value >= .5:
-            precedenceFreqency[i] += 1
-
-    # Sort candidates starting with those that precede the most candidates
-    sigma = [candidate for candidate, _ in precedenceFreqency.items()]
-    sigma.sort(key=lambda num : precedenceFreqency[num], reverse=True)
-
-    # Add back the unranked candidates
-    # that were in the permutable portion 
-    # of baseList
-    sigma.extend(permutableUnrankedCandidates)
-
-    # Append the fixed portion of baseList onto 
-    # the optimal sigma, assuming some items of 
-    # the baseList are fixed
-    if permBound < n:
-        sigma.extend(fixedElements)
-
-    # Convert to tuple for consistency
-    return tuple(sigma)
+    return model, x_vars
@@ -0,0 +1,77 @@
+import time
+import utils
+import numpy as np
+import quick_sort_base as qsb
+
+ALGORITHM_NAME = "KwikSort"
+
+def run(data, params):
+    """
+    This method implements KwikSort: a quick-sort
+    that picks pivots uniformly at random and places
+    candidate a before the pivot iff a precedes the
+    pivot at least as often as the reverse in the
+    top-lists provided in data.
+
+    If params['repetitions'] = R is given, R independent
+    runs are sorted together (see quick_sort_base.py)
+    and the ranking with the smallest distance is kept.
+
+    If params['top'] = k is given, only segments
+    containing one of the first k positions are
+    partitioned; the remaining candidates follow in
+    arbitrary order.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+    ------------------------------------
+
+    Returns
+
+    'AGORITHM_NAME': str
+                     The identifier for the algorithm implemented in
+                     this current file.
+
+    'time': float
+            Time if took for the main component of the algorithm to run
+
+    'acccuracy': float
+                 The generalized Kendall Tau Distance between the
+                 dataset top-lists and sigma
+
+    """
+    start_time = time.process_time()
+
+    # 'n' is the number of candidates, also the number of ranks
+    n = params['n']
+    # 'N' is the total number of voters
+    N = params['N']
+    # 's0' is the optional ground truth full ranking of the candidates
+    # (distribution is drawn off this full ranking)
+    s0 = params['s0']
+
+    rng = np.random.default_rng(params['seed'])
+    repetitions = params.get('repetitions', 1)
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+
+    # a is always placed before pivot b when a wins (or ties)
+    # their pairwise contest
+    leftProbability = (precedenceMatrix >= precedenceMatrix.T).astype(float)
+
+    sigma = qsb.best_of_runs(leftProbability, precedenceMatrix, repetitions, rng, params.get('top'))
+
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
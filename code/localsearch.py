@@ -18,46 +18,77 @@ def run(data, params, sigma=None):
     s0 = params['s0']
 
 
-    # if sigma is not given by previous algorithm, 
+    rng = np.random.default_rng(params['seed'])
+
+    # if sigma is not given by previous algorithm,
     # make it a random starting permutation
     if sigma is None:
-        sigma = np.random.permutation(n)
+        sigma = rng.permutation(n)
 
-    precedenceMatrix = utils.precedenceMatrix(data,n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
+    sigma = search(sigma, precedenceMatrix, rng)
 
-    
-    def bestMove(index):
-        # set new_index default value to be -1
-        new_index = -1
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+
+
+
+def search(sigma, precedenceMatrix, rng=None, deadline=None):
+    """
+    Moves candidates of sigma to the position with the fewest
+    disagreements until no single move improves sigma.
+    -------------------------------------
+
+    Params
+
+    'sigma': list, tuple, or np.array of ints
+            The starting full ranking
 
-        # get cost at current index 
-        # (to ensure that a new_index 
-        # selected below does not tie the 
-        # cost of leaving a candidate 
-        # unmoved)
-        oldCost = utils.disagreements(sigma,index,index,precedenceMatrix)
-        min_cost = oldCost
-        
-        for i in range(n):
-            curr_cost = utils.disagreements(sigma, index, i, precedenceMatrix)
+    'precedenceMatrix': 2D n x n np.array
+            See utils.py
 
-            # if better than before, update
-            if curr_cost < min_cost:
-                new_index = i
-                min_cost = curr_cost
+    'rng': np.random.Generator
+            Source of the order in which positions are visited.
+            Defaults to numpy's global random state.
 
-        return new_index if new_index != index else -1
+    'deadline': float
+            A time.time() value after which the search stops
+            and returns the ranking found so far, even if it
+            is not yet a local optimum.
+    ------------------------------------
+
+    Returns
+        The local optimum as an np.array
+    """
+    if rng is None:
+        rng = np.random
+
+    n = len(sigma)
+    sigma = np.array(sigma)
+
+    def bestMove(index):
+        # cost at current index ensures that a new
+        # index selected below does not tie the
+        # cost of leaving a candidate unmoved
+        costs = utils.insertionCosts(sigma, index, precedenceMatrix)[:n]
+        new_index = np.argmin(costs)
+
+        return new_index if costs[new_index] < costs[index] else -1
 
 
 
     while(True):
         # iterate over positions i randomly
-        order = np.random.permutation(n)
+        order = rng.permutation(n)
         # flag to be used
         moved = False
 
         for i in order:
+            if deadline is not None and time.time() >= deadline:
+                return sigma
+
             b = bestMove(i)
             if b < 0:
                 continue
@@ -69,13 +100,10 @@ def run(data, params, sigma=None):
             # move candidate from pos i to pos b
             sigma = np.delete(sigma, i)
             sigma = np.insert(sigma, b, cand)
-            
+
 
         # if not a single candidate was moved, exit loop
         if not moved:
             break
 
-    time_elapsed = (time.process_time() - start_time) * 1000
-
-    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
-    
+    return sigma
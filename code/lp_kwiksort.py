@@ -0,0 +1,71 @@
+import time
+import utils
+import numpy as np
+import integer_program as ip
+import quick_sort_base as qsb
+
+ALGORITHM_NAME = "LP-KwikSort"
+
+def run(data, params):
+    """
+    This method implements LP-KwikSort: the linear-programming
+    relaxation used by Relaxed-Linear-Program is solved once,
+    then a quick-sort with uniformly random pivots places
+    candidate a before the pivot b with probability x[a,b],
+    the LP value of a preceding b. This rounding replaces
+    counting the x >= .5 entries of each candidate.
+
+    If params['repetitions'] = R is given, R independent
+    roundings are sorted together (see quick_sort_base.py)
+    and the ranking with the smallest distance is kept.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+    ------------------------------------
+
+    Returns
+
+    'AGORITHM_NAME': str
+                     The identifier for the algorithm implemented in
+                     this current file.
+
+    'time': float
+            Time if took for the main component of the algorithm to run
+
+    'acccuracy': float
+                 The generalized Kendall Tau Distance between the
+                 dataset top-lists and sigma
+
+    """
+    start_time = time.process_time()
+
+    # 'n' is the number of candidates, also the number of ranks
+    n = params['n']
+    # 'N' is the total number of voters
+    N = params['N']
+    # 's0' is the optional ground truth full ranking of the candidates
+    # (distribution is drawn off this full ranking)
+    s0 = params['s0']
+
+    rng = np.random.default_rng(params['seed'])
+    repetitions = params.get('repetitions', 1)
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+    leftProbability = ip.relaxedPrecedence(data, params)
+
+    sigma = qsb.best_of_runs(leftProbability, precedenceMatrix, repetitions, rng)
+
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
@@ -394,7 +394,7 @@ def fit_gmm(rankings, s0=None):
     m , n = rankings.shape
     if s0 is None:
         s0 = np.argsort(np.argsort(rankings.sum(axis=0))) #borda
-    V_avg = np.mean(np.array([ranking_to_v(sigma)[:-1] for sigma in rankings]), axis = 0)
+    V_avg = np.mean(ranking_to_v(rankings)[:, :-1], axis = 0)
     try:
         theta = []
         for j in range(1,n):
@@ -550,7 +550,7 @@ def likelihood_mm(perms, s0, theta):
     # print(probs,m,n)
     return probs.sum()
 
-def sampling_mm(m,n,theta=None, phi=None, s0=None):
+def sampling_mm(m,n,theta=None, phi=None, s0=None, rng=None):
     """This function generates m permutations (rankings) according
     to Mallows Models given a parameter of dispersion (theta or phi).
     It applies the sampling_gmm function with dispersion vector filled with
@@ -567,19 +567,23 @@ def sampling_mm(m,n,theta=None, phi=None, s0=None):
             The dispersion parameter phi
         s0: ndarray
             The consensus permutation
+        rng: np.random.Generator, optional
+            The source of randomness, see sampling_gmm
         Returns
         -------
         list
             The rankings generated
     """
     theta, phi = check_theta_phi(theta, phi)
-    return sampling_gmm(m,[theta]*(n-1),s0=s0)
+    return sampling_gmm(m,[theta]*(n-1),s0=s0,rng=rng)
 
-def sampling_gmm(m,theta,s0=None):
+def sampling_gmm(m,theta,s0=None,rng=None):
     """This function generates m permutations (rankings) according
     to Generalized Mallows Models given a vector of dispersion (theta). It
-    first generates the decomposition vectors and computes then the
-    corresponding permutation using v_to_ranking function
+    first generates the decomposition vectors of all m rankings, one
+    position at a time by inverting the cumulative distribution of that
+    position, and computes then the corresponding permutations using
+    v_to_ranking function
         Parameters
         ----------
         m: int
@@ -588,29 +592,89 @@ def sampling_gmm(m,theta,s0=None):
             The dispersion vector for GMM
         s0: ndarray
             The consensus permutation
+        rng: np.random.Generator, optional
+            The source of randomness. A new unseeded Generator by default
         Returns
         -------
-        list
-            The rankings generated
+        ndarray
+            The rankings generated, one per row
     """
     #  returns RANKINGS!
     n = len(theta)+1
     if s0 is None:
         s0 = np.array(range(n))
-    psi = [(1 - np.exp(( - n + i )*(theta[ i ])))/(1 - np.exp( -theta[i])) for i in range(n-1)]
-    vprobs = np.zeros((n,n))
-    for j in range(n-1):
-        vprobs[j][0] = 1.0/psi[j]
-        for r in range(1,n-j):
-            vprobs[j][r] = np.exp( -theta[j] * r ) / psi[j]
-    sample = []
-    vs = []
-    for samp in range(m):
-        v = [np.random.choice(n,p=vprobs[i,:]) for i in range(n-1)]
-        v += [0]
-        ranking = v_to_ranking(v, n)
-        sample.append(ranking)
-    return np.array([s[s0] for s in sample])
+    if rng is None:
+        rng = np.random.default_rng()
+    v = sampling_v(m, theta, n, rng)
+    sample = v_to_ranking(v, n)
+    return sample[:, np.asarray(s0)]
+
+def sampling_v(m, theta, k, rng):
+    """This function generates the first k entries of m decomposition vectors
+    according to Generalized Mallows Models, one position at a time by
+    inverting the cumulative distribution of that position
+        Parameters
+        ----------
+        m: int
+            The number of vectors to generate
+        theta: ndarray
+            The dispersion vector for GMM, of length n-1
+        k: int
+            The number of entries generated, at most n
+        rng: np.random.Generator
+            The source of randomness
+        Returns
+        -------
+        ndarray
+            The (m, k) entries. If k is n, the vectors are complete and finish with 0
+    """
+    n = len(theta)+1
+    u = rng.random((m, min(k, n-1)))
+    v = np.zeros((m, k), dtype=np.int64)
+    for j in range(min(k, n-1)):
+        psi = (1 - np.exp(( - n + j )*(theta[ j ])))/(1 - np.exp( -theta[j]))
+        cdf = np.cumsum(np.exp( -theta[j] * np.arange(n-j) ) / psi)
+        # v[:,j] = r where cdf[r-1] <= u < cdf[r], which has probability
+        # exp(-theta_j * r) / psi_j. The minimum guards against rounding in the last entry
+        v[:, j] = np.minimum(np.searchsorted(cdf, u[:, j], side='right'), n-j-1)
+    return v
+
+def sampling_top_k_lists(m,n,k,theta=None, phi=None, s0=None, seed=None):
+    """This function generates m top-k lists according to Mallows Models
+    adapted to top-k rankings, with the same distribution as
+    sampling_top_k_rankings but as lists of candidates. When the consensus
+    is the identity, the top-k candidates are the first k items of the
+    sampled permutations, so only the first k entries of the decomposition
+    vectors are drawn and decoded, in O(k^2) per list however large n is.
+        Parameters
+        ----------
+        m: int
+            The number of lists to generate
+        n: int
+            The number of candidates
+        k: int
+            The length of the lists
+        theta: float, optional (if phi given)
+            The dispersion parameter theta
+        phi: float, optional (if theta given)
+            The dispersion parameter phi
+        s0: ndarray
+            The consensus ranking
+        seed: int or np.random.SeedSequence
+            Seed of the Generator used for this call only
+        Returns
+        -------
+        ndarray
+            The (m, k) lists, the candidate ranked first in column 0
+    """
+    theta, phi = check_theta_phi(theta, phi)
+    rng = np.random.default_rng(seed)
+    if s0 is None or np.array_equal(s0, np.arange(n)):
+        return v_prefix_to_ranking(sampling_v(m, [theta]*(n-1), k, rng))
+    # otherwise position pos holds s0^-1[s[s0[pos]]] for the full permutation s
+    s0 = np.asarray(s0)
+    s = v_to_ranking(sampling_v(m, [theta]*(n-1), n, rng), n)
+    return np.argsort(s0)[s[:, s0[:k]]]
 
 def sampling_top_k_rankings(m,n,k,theta=None, phi=None, s0=None, seed=None):
     """This function generates m top-k rankings according according
@@ -628,50 +692,152 @@ def sampling_top_k_rankings(m,n,k,theta=None, phi=None, s0=None, seed=None):
             number of known positions of items for the rankings
         s0: ndarray
             The consensus ranking
+        seed: int
+            Seed of the Generator used for this call only
         Returns
         -------
-        list
-            The top-k rankings generated
+        ndarray
+            The top-k rankings generated: entry i of a row is the position
+            of item i if it is among the first k, and nan otherwise
     """
-    np.random.seed(seed)
-    sample_orderings = sampling_mm(m,n,theta=theta, phi=phi, s0=s0)
-    if s0 is None:
-        s0 = np.array(range(n))
-    sample_rankings = np.array([inverse(ordering) for ordering in sample_orderings])
-    sample_rankings = np.array([ran[s0] for ran in sample_rankings])
-    sample = np.array([[i if i in range(k) else np.nan for i in ranking] for
-                        ranking in sample_rankings])
+    lists = sampling_top_k_lists(m, n, k, theta, phi, s0, seed)
+    sample = np.full((m, n), np.nan)
+    sample[np.arange(m)[:, None], lists] = np.arange(k)
     return sample
 
 
+def v_prefix_to_ranking(v):
+    """This function computes the first k items of the permutations given the
+    first k entries of their decomposition vectors, in O(k^2) per permutation
+    whatever its length
+        Parameters
+        ----------
+        v: ndarray
+            The (m, k) first entries of m decomposition vectors
+        Returns
+        -------
+        ndarray
+            The (m, k) first items of the m permutations
+    """
+    m, k = v.shape
+    # the items taken so far, in increasing order
+    taken = np.zeros((m, 0), dtype=np.int64)
+    items = np.zeros((m, k), dtype=np.int64)
+    for i in range(k):
+        # the (v[i]+1)-th item not taken: skip every taken item at or before it
+        item = v[:, i].copy()
+        for j in range(i):
+            item += taken[:, j] <= item
+        items[:, i] = item
+        taken = np.sort(np.concatenate((taken, item[:, None]), axis=1), axis=1)
+    return items
+
+def fenwick_trees(m, n, fill):
+    """This function creates a batch of m Fenwick (binary indexed) trees over
+    the 1-based positions 1, ..., n, where every position holds fill (0 or 1).
+    Columns past n, up to the next power of two, and a last sink column,
+    hold a sentinel larger than any count, so that the batched operations
+    below can run the same O(log n) steps on every tree without masking
+        Returns
+        -------
+        ndarray
+            The (m, size+2) trees, column 0 being unused
+    """
+    size = 1 << max(n, 1).bit_length()
+    positions = np.arange(size + 2)
+    tree = np.where(positions <= n, fill * (positions & -positions), np.iinfo(np.int64).max // 2)
+    tree[0] = 0
+    return np.tile(tree, (m, 1))
+
+def fenwick_add(tree, index, delta):
+    """This function adds delta to the position index of each tree of
+    a batch (see fenwick_trees), in O(log n)
+        Parameters
+        ----------
+        tree: ndarray
+            The (m, size+2) trees
+        index: ndarray
+            The (m,) positions, one per tree
+        delta: int
+            The amount added
+    """
+    rows = np.arange(len(tree))
+    sink = tree.shape[1] - 1
+    index = np.array(index, dtype=np.int64)
+    for _ in range(sink.bit_length()):
+        tree[rows, index] += delta
+        index = np.minimum(index + (index & -index), sink)
+
+def fenwick_prefix(tree, index):
+    """This function computes the sum of the positions 1, ..., index
+    of each tree of a batch (see fenwick_trees), in O(log n)
+        Parameters
+        ----------
+        tree: ndarray
+            The (m, size+2) trees
+        index: ndarray
+            The (m,) positions, one per tree
+        Returns
+        -------
+        ndarray
+            The (m,) prefix sums
+    """
+    rows = np.arange(len(tree))
+    index = np.array(index, dtype=np.int64)
+    total = np.zeros(len(tree), dtype=tree.dtype)
+    for _ in range(tree.shape[1].bit_length()):
+        total += tree[rows, index]
+        index -= index & -index
+    return total
+
 def v_to_ranking(v, n):
     """This function computes the corresponding permutation given
-    a decomposition vector
+    a decomposition vector, in O(n log n) with a Fenwick tree over the
+    items not placed yet
         Parameters
         ----------
         v: ndarray
-            Decomposition vector, same length as the permutation, last item must be 0
+            Decomposition vector, same length as the permutation, last item must be 0.
+            May also be an (m, n) array of m decomposition vectors
         n: int
             Length of the permutation
         Returns
         -------
         ndarray
-            The permutation corresponding to the decomposition vectors
+            The permutation corresponding to the decomposition vectors, or
+            the (m, n) permutations of m vectors
     """
-    rem = list(range(n))
-    rank = np.array([np.nan]*n)
-    for i in range(len(v)):
-        rank[i] = rem[v[i]]
-        rem.pop(v[i])
-    return rank
+    V = np.atleast_2d(np.asarray(v, dtype=np.int64))
+    m = len(V)
+    rows = np.arange(m)
+    tree = fenwick_trees(m, n, 1)
+    sink = tree.shape[1] - 1
+    rank = np.zeros((m, n), dtype=np.int64)
+    for i in range(V.shape[1]):
+        # descend to the last position whose prefix holds fewer than v[i]+1
+        # available items, the item being the next position
+        position = np.zeros(m, dtype=np.int64)
+        remaining = V[:, i] + 1
+        step = (sink - 1) >> 1
+        while step > 0:
+            candidate = np.minimum(position + step, sink)
+            counts = tree[rows, candidate]
+            fewer = counts < remaining
+            remaining -= np.where(fewer, counts, 0)
+            position = np.where(fewer, candidate, position)
+            step >>= 1
+        rank[:, i] = position
+        fenwick_add(tree, position + 1, -1)
+    return rank if np.ndim(v) == 2 else rank[0]
 
 def ranking_to_v(sigma, k=None):
     """This function computes the corresponding decomposition vector given
-    a permutation
+    a permutation, in O(n log n) by counting the smaller items after each
+    position with a Fenwick tree
         Parameters
         ----------
         sigma: ndarray
-            A permutation
+            A permutation, or an (m, n) array of m permutations
         k: int, optionnal
             The index to perform the conversion for a partial
             top-k list
@@ -679,20 +845,25 @@ def ranking_to_v(sigma, k=None):
         -------
         ndarray
             The decomposition vector corresponding to the permutation. Will be
-            of length n and finish with 0
+            of length n and finish with 0. An (m, n) array for m permutations
     """
-    n = len(sigma)
+    S = np.atleast_2d(np.asarray(sigma))
+    m, n = S.shape
     if k is not None:
-        sigma = sigma[:k]
-        sigma = np.concatenate((sigma,np.array([np.float(i) for i in range(n) if i not in sigma])))
-    V = []
-    for j, sigma_j in enumerate(sigma):
-        V_j = 0
-        for i in range(j+1,n):
-            if sigma_j > sigma[i]:
-                V_j += 1
-        V.append(V_j)
-    return np.array(V)
+        # the first k items, followed by the others in increasing order
+        top = S[:, :k].astype(np.int64)
+        ranked = np.zeros((m, n), dtype=bool)
+        ranked[np.arange(m)[:, None], top] = True
+        rest = np.argsort(ranked, axis=1, kind='stable')[:, :n-k]
+        S = np.concatenate((top, rest), axis=1)
+    S = S.astype(np.int64)
+    tree = fenwick_trees(m, n, 0)
+    V = np.zeros((m, n), dtype=np.int64)
+    for j in range(n-1, -1, -1):
+        # the items after j already in the tree that are smaller than sigma_j
+        V[:, j] = fenwick_prefix(tree, S[:, j])
+        fenwick_add(tree, S[:, j] + 1, 1)
+    return V if np.ndim(sigma) == 2 else V[0]
 # def discordances_to_permut(indCode, refer):
 #     """
 #         Parameters
@@ -50,7 +50,7 @@ def run(data, params):
 
     # Order candidates by non-decreasing pair-wise contest wins 
     # (ascending order with lexicographic tie-breaking)
-    precedenceMatrix = utils.precedenceMatrix(data, n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
     # Credits to Sayan-Paul for starter code for merge sort
     # See: https://github.com/Sayan-Paul/Sort-Library-in-Python/blob/master/sortlib.py
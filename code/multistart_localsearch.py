@@ -0,0 +1,187 @@
+import os
+import time
+import utils
+import numpy as np
+import borda, copeland, footrule
+import localsearch
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+ALGORITHM_NAME = "Multi-Start-Local-Search"
+
+DEFAULT_RESTARTS = 8
+
+# Starting rankings other than random permutations
+START_ALGORITHMS = (borda.run, copeland.run, footrule.run)
+
+# Each worker process attaches to the parent's precedence matrix once
+sharedMemory = None
+sharedPrecedence = None
+
+
+def run(data, params):
+    """
+    Runs Local-Search from several starting rankings in parallel and
+    keeps the best local optimum. The starts are the outputs of Borda+,
+    Copeland and FootRule+, followed by random permutations.
+
+    The number of restarts, worker processes and the global time budget
+    (in seconds) are read from params['restarts'], params['workers'] and
+    params['time_budget'].
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+    ------------------------------------
+
+    Returns
+
+    'AGORITHM_NAME': str
+                     The identifier for the algorithm implemented in
+                     this current file.
+
+    'time': float
+            CPU time of the parent and all workers
+
+    'acccuracy': float
+                 The generalized Kendall Tau Distance between the
+                 dataset top-lists and sigma
+
+    """
+    start_time = time.process_time()
+
+    # get data statistics/params
+    n = params['n']
+    N = params['N']
+    s0 = params['s0']
+
+    sigma, _, workerTime = multiStart(data, params,
+                                      params.get('restarts', DEFAULT_RESTARTS),
+                                      params.get('workers'),
+                                      params.get('time_budget'))
+
+    time_elapsed = (time.process_time() - start_time + workerTime) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+
+
+
+def multiStart(data, params, restarts, workers=None, timeBudget=None):
+    """
+    Runs 'restarts' independent local searches across a process pool.
+    Every worker reads the same precedence matrix from shared memory.
+    Restart i draws its random numbers from the i'th child of
+    params['seed'], so results do not depend on the number of workers.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            See run
+
+    'params': dict
+            See run
+
+    'restarts': int
+            The number of local searches
+
+    'workers': int
+            The number of processes. Defaults to the number of cores.
+
+    'timeBudget': float
+            Wall-clock seconds after which running searches return their
+            current ranking and searches not yet started are skipped.
+    ------------------------------------
+
+    Returns
+
+    'sigma': tuple
+            The best ranking found
+
+    'costs': np.array
+            The generalized Kendall Tau Distance of every search that
+            ran, in restart order
+
+    'workerTime': float
+            Total CPU seconds spent in the workers
+    """
+    n = params['n']
+    N = params['N']
+
+    deadline = None if timeBudget is None else time.time() + timeBudget
+
+    starts = [alg(data, params)[3] for alg in START_ALGORITHMS[:restarts]]
+    starts += [None] * (restarts - len(starts))
+    seeds = np.random.SeedSequence(params['seed']).spawn(restarts)
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+    memory = shared_memory.SharedMemory(create=True, size=precedenceMatrix.nbytes)
+    try:
+        shared = np.ndarray(precedenceMatrix.shape, dtype=precedenceMatrix.dtype, buffer=memory.buf)
+        shared[:] = precedenceMatrix
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=attach,
+                                 initargs=(memory.name, precedenceMatrix.shape, precedenceMatrix.dtype)) as pool:
+            futures = [pool.submit(searchFrom, start, seed, n, N, deadline)
+                       for start, seed in zip(starts, seeds)]
+            results = [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
+
+    workerTime = sum(result[2] for result in results)
+    results = [result for result in results if result[0] is not None]
+
+    costs = np.array([cost for _, cost, _ in results])
+    if len(results) == 0:
+        # The budget ran out before any search began
+        sigma = tuple(starts[0]) if starts[0] is not None else tuple(range(n))
+    else:
+        sigma = tuple(results[np.argmin(costs)][0].tolist())
+
+    return sigma, costs, workerTime
+
+
+
+def attach(name, shape, dtype):
+    """
+    Pool initializer: maps the parent's shared precedence matrix
+    into this worker.
+    """
+    global sharedMemory, sharedPrecedence
+    sharedMemory = shared_memory.SharedMemory(name=name)
+    sharedPrecedence = np.ndarray(shape, dtype=dtype, buffer=sharedMemory.buf)
+
+
+
+def searchFrom(start, seed, n, N, deadline):
+    """
+    A single restart, executed in a worker. 'start' is None for a
+    random permutation. Returns (sigma, cost, cpu seconds), where
+    sigma is None if the deadline passed before the search began.
+    """
+    start_time = time.process_time()
+
+    if deadline is not None and time.time() >= deadline:
+        return None, None, time.process_time() - start_time
+
+    rng = np.random.default_rng(seed)
+    if start is None:
+        start = rng.permutation(n)
+
+    sigma = localsearch.search(start, sharedPrecedence, rng, deadline)
+    cost = utils.precedenceKendallTauDistance(sigma, sharedPrecedence, N)
+
+    return sigma, cost, time.process_time() - start_time
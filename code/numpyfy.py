@@ -1,5 +1,6 @@
 import numpy as np
-import search
+import results_index
+import results_store
 import sim 
 import run_experiments
 import collections
@@ -29,16 +30,10 @@ for postProcessAlgo in postProcessAlgos:
             algorithms.append(algoName)
             comboAlgos.add(algoName)
 
-f = search.Search("../Synthetic-Results/")
+# all results, from the CSV files and the results store, are loaded once, see results_index.py
+index = results_index.ResultsIndex("../Synthetic-Results/", store=results_store.DEFAULT_DATABASE)
 algorithms = list(algorithms)
 
-def convert_to_npArray(filename):
-    return np.genfromtxt(filename, delimiter=',', skip_header=1, usecols = (1,2))
-
-def average(array):
-    m, _ = np.shape(array)
-    return np.sum(array, axis=0) / m
-
 def listByParam(parameter):
     if parameter == 'n':
         l = run_experiments.ns
@@ -53,25 +48,20 @@ def listByParam(parameter):
     
     return l
 
+def averages(parameter):
+    # Average distance and time of every (value of parameter, algorithm)
+    # pair over the synthetic (Poisson) results, in a single group-by
+    rows = index.filter(distribution="poisson", algo=algorithms)
+    return rows.groupby([parameter, "algo"])[["distance", "time"]].mean()
+
 def by(parameter): 
-    numAlgorithms = len(algorithms)   
-    
     l = listByParam(parameter)
 
     # want to get the average of all algorithms for each value of n,N,th, or k
     # will store in a len(l)xnumAlgorithmsx2 np.array (params, algos, each with 2 data 
-    # points: time and accuracy)
-    out = np.empty((len(l),numAlgorithms,2))
-
-    for j in range(len(l)):
-        algs = np.empty((numAlgorithms,2))
-        for i in range(len(algorithms)):
-            _, fname = f.filter_by_param_and_algo(parameter, l[j], algorithms[i])
-            arr = convert_to_npArray(fname)
-            algs[i] = average(arr)
-            
-        out[j] = algs
-    return out
+    # points: time and accuracy). Pairs without results are nan
+    pairs = pd.MultiIndex.from_product([l, algorithms], names=[parameter, "algo"])
+    return averages(parameter).reindex(pairs).to_numpy().reshape(len(l), len(algorithms), 2)
 
 def tidydf(parameter):
     l = listByParam(parameter)
@@ -79,17 +69,12 @@ def tidydf(parameter):
     info = by(parameter)
 
     headers = ["Algorithms", parameter, "Average Kendall-Tau Distance", "Time (CPU Seconds)"]
-    output = list()
-
-    # Fill in time and distance data
-    for i in range(len(info)):
-        table = info[i]
-        for j in range(len(table)):
-            distance, time = table[j]
-            rowToAdd = [algorithms[j], l[i], distance, time]
-            output.append(rowToAdd)
-            
-    return pd.DataFrame(output, columns=headers)
+
+    # One row per (value of parameter, algorithm), in the order of info
+    columns = [np.tile(algorithms, len(l)), np.repeat(l, len(algorithms)),
+               info[:, :, 0].ravel(), info[:, :, 1].ravel()]
+
+    return pd.DataFrame(dict(zip(headers, columns)))
 
 if __name__ == '__main__':
     print(f'By n: {run_experiments.ns}\n {tidydf("n")}\n')
@@ -0,0 +1,139 @@
+import numpy as np
+from sufficient_statistics import SufficientStatistics
+
+"""
+Streaming reader for PrefLib soi files (the format parsed by
+Simulation.parseCSV in sim.py). Rather than building a Counter with
+one tuple per line, the top-lists are read in chunks of about
+'chunkSize' bytes, tokenized with numpy, and handed out packed
+(see sufficient_statistics.py), so memory is bounded by the chunk size.
+"""
+
+DEFAULT_CHUNK_SIZE = 1 << 24
+
+
+def readHeader(path):
+    """
+    Reads the header of a PrefLib soi file.
+    --------------------------------------
+
+    Params
+
+    'path': str
+            Path to the file
+    --------------------------------------
+
+    Returns
+        'n': int
+             The number of candidates
+
+        'N': int
+             The number of voters
+
+        'offset': int
+             The byte offset of the first top-list
+    """
+    with open(path, 'rb') as f:
+        n = int(f.readline())
+
+        # skip n next lines (candidate info)
+        for _ in range(n):
+            f.readline()
+
+        N = int(f.readline().split(b',')[0])
+        return n, N, f.tell()
+
+
+
+def parseLines(text):
+    """
+    Tokenizes complete soi lines 'frequency,c1,c2,...' into packed
+    top-lists, converting candidates from [1,...,n] to [0,...,n-1]
+    --------------------------------------
+
+    Params
+
+    'text': bytes
+    --------------------------------------
+
+    Returns
+        The packed (candidates, lengths, weights)
+    """
+    text = text.replace(b'\r', b'').strip(b'\n')
+    while b'\n\n' in text:
+        text = text.replace(b'\n\n', b'\n')
+
+    if len(text) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # the number of fields on each line is one more than its number of commas
+    buffer = np.frombuffer(text, dtype=np.uint8)
+    lineEnds = np.append(np.flatnonzero(buffer == ord('\n')), len(buffer))
+    commas = np.cumsum(buffer == ord(','))[lineEnds - 1]
+    fields = np.diff(commas, prepend=0) + 1
+
+    values = np.fromstring(text.replace(b'\n', b',').decode(), dtype=np.int64, sep=',')
+    if len(values) != np.sum(fields):
+        raise ValueError("malformed top-list line")
+
+    # the first field of every line is the frequency
+    lineStarts = np.cumsum(fields) - fields
+    isWeight = np.zeros(len(values), dtype=bool)
+    isWeight[lineStarts] = True
+
+    return values[~isWeight] - 1, fields - 1, values[lineStarts].astype(np.float64)
+
+
+
+def iterTopLists(path, chunkSize=DEFAULT_CHUNK_SIZE, start=None, end=None):
+    """
+    Yields the top-lists of a PrefLib soi file as packed
+    (candidates, lengths, weights) chunks.
+
+    If a byte range [start, end) is given, only the lines starting
+    in it are read, so that consecutive ranges split the top-lists
+    between them (see sharded_statistics.py).
+    """
+    _, _, offset = readHeader(path)
+    start = offset if start is None else max(start, offset)
+
+    with open(path, 'rb') as f:
+        # skip the line that started before the range
+        if start > offset:
+            f.seek(start - 1)
+            f.readline()
+        else:
+            f.seek(start)
+
+        while end is None or f.tell() < end:
+            size = chunkSize if end is None else min(chunkSize, end - f.tell())
+            text = f.read(size)
+            if len(text) == 0:
+                return
+
+            # complete the last line of the chunk
+            if not text.endswith(b'\n'):
+                text += f.readline()
+
+            yield parseLines(text)
+
+
+
+def readStatistics(path, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a PrefLib soi file into its SufficientStatistics.
+    --------------------------------------
+
+    Returns
+        'statistics': SufficientStatistics
+
+        'N': int
+             The number of voters given by the file's header
+    """
+    n, N, _ = readHeader(path)
+
+    statistics = SufficientStatistics(n)
+    for chunk in iterTopLists(path, chunkSize):
+        statistics.fold(*chunk)
+
+    return statistics, N
@@ -1,4 +1,7 @@
-# in-place quicksort based on the implementation of 
+import numpy as np
+import utils
+
+# in-place quicksort based on the implementation of
 # StackOverflow user "Ant"
 # See: https://stackoverflow.com/questions/17773516/in-place-quicksort-in-python
 def sub_partition(q, array, start, end, idx_pivot):
@@ -13,7 +16,7 @@ def sub_partition(q, array, start, end, idx_pivot):
     j = start + 1
 
     while j <= end:
-        if q[j,pivot] >= q[pivot,j]:
+        if q[array[j],pivot] >= q[pivot,array[j]]:
             array[j], array[i] = array[i], array[j]
             i += 1
         j += 1
@@ -21,9 +24,12 @@ def sub_partition(q, array, start, end, idx_pivot):
     array[start], array[i - 1] = array[i - 1], array[start]
     return i - 1
 
-def quicksort(q, array, pivotFunc, start=0, end=None):
+def quicksort(q, array, pivotFunc, start=0, end=None, top=None):
     # Note: q is a precedence matrix
     # See utils.py
+    #
+    # If top is given, only array[:top] ends up sorted: partitions
+    # lying entirely at positions >= top are left as they are
     if end is None:
         end = len(array) - 1
 
@@ -32,10 +38,115 @@ def quicksort(q, array, pivotFunc, start=0, end=None):
 
     idx_pivot = pivotFunc(array, start, end)
     i = sub_partition(q, array, start, end, idx_pivot)
-   
-    quicksort(q, array, pivotFunc, start, i - 1)
-    quicksort(q, array, pivotFunc, i + 1, end)
 
+    quicksort(q, array, pivotFunc, start, i - 1, top)
+    if top is None or i + 1 < top:
+        quicksort(q, array, pivotFunc, i + 1, end, top)
+
+
+def batch_quicksort(leftProbability, repetitions, rng, top=None):
+    """
+    Runs 'repetitions' independent randomized-pivot quicksorts
+    (KwikSort) over all n candidates at once. Rather than recursing,
+    every round partitions all unsorted segments of all runs
+    simultaneously, so each round is a handful of numpy operations
+    over an array of size repetitions * n.
+    --------------------------------------
+
+    Params
+
+    'leftProbability': 2D n x n np.array
+            leftProbability[a,b] is the probability that candidate
+            a is placed before candidate b when b is the pivot.
+            A 0/1 matrix gives the deterministic majority rule.
+
+    'repetitions': int
+            The number of independent runs
+
+    'rng': np.random.Generator
+            Source of the random pivots and random placements
+
+    'top': int
+            If given, segments starting at position top or later
+            are not partitioned, so only the first top positions
+            of each ranking are sorted
+    ---------------------------------------
+
+    Returns
+        'sigmas': 2D repetitions x n np.array
+                  Row r is the full ranking produced by run r
+    """
+    n = leftProbability.shape[0]
+
+    # Every element is a (run, candidate) pair. Each element belongs
+    # to the segment [start, start + size) of its run's final ranking
+    runs = np.repeat(np.arange(repetitions), n)
+    candidates = np.tile(np.arange(n), repetitions)
+    start = np.zeros(repetitions * n, dtype=np.int64)
+    size = np.full(repetitions * n, n, dtype=np.int64)
+
+    if top is None:
+        top = n
+
+    while True:
+        active = np.flatnonzero((size > 1) & (start < top))
+        if len(active) == 0:
+            break
+
+        # A segment is identified by its run and its start position
+        key = runs[active] * n + start[active]
+
+        # The pivot of each segment is the member with the smallest
+        # random priority, i.e. a uniformly random member
+        order = np.lexsort((rng.random(len(active)), key))
+        sortedKey = key[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sortedKey[1:] != sortedKey[:-1]
+        segmentKeys = sortedKey[first]
+        segmentPivots = candidates[active[order[first]]]
+
+        segment = np.searchsorted(segmentKeys, key)
+        pivot = segmentPivots[segment]
+        members = candidates[active]
+
+        isPivot = members == pivot
+        left = ~isPivot & (rng.random(len(active)) < leftProbability[members, pivot])
+        right = ~isPivot & ~left
+
+        leftSize = np.bincount(segment, weights=left, minlength=len(segmentKeys)).astype(np.int64)
+        leftSize = leftSize[segment]
+
+        # Elements before the pivot keep the segment's start
+        newStart = start[active].copy()
+        newSize = np.where(left, leftSize, 1)
+
+        newStart[isPivot] += leftSize[isPivot]
+
+        newStart[right] += leftSize[right] + 1
+        newSize[right] = size[active][right] - leftSize[right] - 1
+
+        start[active] = newStart
+        size[active] = newSize
+
+    # Members of a segment left unsorted (at positions >= top)
+    # fill the segment in arbitrary order
+    key = runs * n + start
+    order = np.argsort(key, kind='stable')
+    sortedKey = key[order]
+    offset = np.empty(len(order), dtype=np.int64)
+    offset[order] = np.arange(len(order)) - np.searchsorted(sortedKey, sortedKey)
 
+    sigmas = np.empty((repetitions, n), dtype=np.int64)
+    sigmas[runs, start + offset] = candidates
+    return sigmas
 
 
+def best_of_runs(leftProbability, precedenceMatrix, repetitions, rng, top=None):
+    """
+    Runs batch_quicksort and returns the ranking among the
+    'repetitions' runs with the fewest pair-wise disagreements
+    according to precedenceMatrix (see utils.py).
+    """
+    sigmas = batch_quicksort(leftProbability, repetitions, rng, top)
+    costs = [utils.precedenceKendallTauDistance(sigma, precedenceMatrix, 1) for sigma in sigmas]
+    return tuple(sigmas[np.argmin(costs)].tolist())
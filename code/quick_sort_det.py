@@ -1,5 +1,6 @@
 import time
 import utils
+import numpy as np
 import quick_sort_base as qsb
 
 ALGORITHM_NAME = "QS-Det"
@@ -20,6 +21,11 @@ def run(data, params):
     candidate a > candidate b iff 
     a precedes b more often than the reverse
     in the top-lists provided in data.
+
+    If params['top'] = k is given, only partitions
+    containing one of the first k positions are
+    sorted (quickselect); the remaining candidates
+    follow in arbitrary order.
     -------------------------------------
 
     Params
@@ -60,19 +66,15 @@ def run(data, params):
     # (distribution is drawn off this full ranking)
     s0 = params['s0']
 
-    precedenceMatrix = utils.precedenceMatrix(data, n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
     def pivotCost(arr, start, end, pivot):
-        cost = 0
         candidate = arr[pivot]
 
-        for i in range(start, pivot):
-            otherCandidate = arr[i]
-            cost += precedenceMatrix[candidate, otherCandidate]
-
-        for i in range(pivot, end+1):
-            otherCandidate = arr[i]
-            cost += precedenceMatrix[otherCandidate, candidate]
+        # summed as arrays, so that compact counts are widened
+        # rather than overflowing (see utils.countDtype)
+        cost = np.sum(precedenceMatrix[candidate, arr[start:pivot]])
+        cost += np.sum(precedenceMatrix[arr[pivot:end+1], candidate])
 
         return cost
 
@@ -89,7 +91,7 @@ def run(data, params):
         return bestPivotSoFar
 
     candidates = [i for i in range(n)]
-    qsb.quicksort(precedenceMatrix, candidates, bestPrecedence)
+    qsb.quicksort(precedenceMatrix, candidates, bestPrecedence, top=params.get('top'))
 
     sigma = tuple(candidates)
 
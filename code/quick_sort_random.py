@@ -13,6 +13,11 @@ def run(data, params):
     candidate a > candidate b iff 
     a precedes b more often than the reverse
     in the top-lists provided in data.
+
+    If params['top'] = k is given, only partitions
+    containing one of the first k positions are
+    sorted (quickselect); the remaining candidates
+    follow in arbitrary order.
     -------------------------------------
 
     Params
@@ -53,13 +58,13 @@ def run(data, params):
     # (distribution is drawn off this full ranking)
     s0 = params['s0']
 
-    precedenceMatrix = utils.precedenceMatrix(data, n)
+    precedenceMatrix = utils.precedenceMatrix(data, n, dense=False, compact=True)
 
     def randomPivot(arr, start, end):
         return random.randint(start, end)
 
     candidates = [i for i in range(n)]
-    qsb.quicksort(precedenceMatrix, candidates, randomPivot)
+    qsb.quicksort(precedenceMatrix, candidates, randomPivot, top=params.get('top'))
 
     sigma = tuple(candidates)
 
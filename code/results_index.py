@@ -0,0 +1,171 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import results_store
+
+"""
+In-memory index of experiment results. Every results CSV in a directory
+(as written by Simulation.writeToFile, named after the dataset's
+parameters) is parsed once into one typed DataFrame, which is pickled
+next to the files so later sessions only parse files that are new or
+have changed. Rows of a results store (see results_store.py) can be
+included as well.
+"""
+
+INDEX_FILE = ".results_index.pkl"
+
+# file: the results file (or store dataset) the row comes from
+# distribution: 'poisson', 'topk' or 'real'
+# n, N, th: the dataset's parameters, missing for real datasets
+# k: the dataset's k as a fraction of n, as in run_experiments.ks_ratio
+# algo, distance, time: one line of the results file
+COLUMNS = ["file", "distribution", "n", "N", "th", "k", "algo", "distance", "time"]
+
+
+class ResultsIndex:
+    """
+    The results in 'directory' and, if given and written to, the results store 'store'.
+    The index is cached in directory/INDEX_FILE unless cache is False.
+    """
+
+    def __init__(self, directory, store=None, cache=True):
+        self.directory = directory
+        self.store = store
+        self.cachePath = os.path.join(directory, INDEX_FILE) if cache else None
+
+        # file name -> (modification time, size) when it was indexed
+        self.files = dict()
+        # the rows read from the files, self.frame adds the store's
+        self.fileFrame = emptyFrame()
+
+        if self.cachePath is not None and os.path.exists(self.cachePath):
+            self.files, self.fileFrame = pd.read_pickle(self.cachePath)
+
+        self.refresh()
+
+
+    def refresh(self):
+        """
+        Indexes the files that appeared or changed since the index was
+        built, drops those that disappeared, and re-reads the store
+        """
+        current = dict()
+        for f in os.listdir(self.directory):
+            path = os.path.join(self.directory, f)
+            if os.path.isfile(path) and f.endswith(".csv"):
+                status = os.stat(path)
+                current[f] = (status.st_mtime_ns, status.st_size)
+
+        stale = {f for f in self.files if self.files[f] != current.get(f)}
+        new = [f for f in sorted(current) if self.files.get(f) != current[f]]
+
+        frames = [self.fileFrame[~self.fileFrame.file.isin(stale)]]
+        frames += [readResultsFile(self.directory, f) for f in new]
+        self.fileFrame = pd.concat(frames, ignore_index=True)
+        self.files = current
+
+        if self.cachePath is not None and (stale or new):
+            self.save()
+
+        self.frame = self.fileFrame
+        # a store no run has written to yet has no rows
+        if self.store is not None and os.path.exists(self.store):
+            self.frame = pd.concat([self.frame, readStore(self.store)], ignore_index=True)
+
+
+    def save(self):
+        """
+        Pickles the index to a temporary file that then replaces
+        the cache, so that concurrent readers (e.g. renderers, see
+        visualizations.renderAll) never see a partly written index
+        """
+        handle, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            pd.to_pickle((self.files, self.fileFrame), path)
+            os.replace(path, self.cachePath)
+        except BaseException:
+            os.remove(path)
+            raise
+
+
+    def filter(self, **criteria):
+        """
+        Returns the rows whose columns equal the given keyword
+        arguments, e.g. filter(n=10, algo="Copeland"). A list of
+        values selects rows equal to any of them.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        for column, value in criteria.items():
+            if column not in COLUMNS:
+                raise ValueError(f"Cannot filter by {column}. Try one of {COLUMNS}")
+            if isinstance(value, (list, tuple, set)):
+                mask &= self.frame[column].isin(list(value)).to_numpy()
+            else:
+                mask &= (self.frame[column] == value).fillna(False).to_numpy(dtype=bool)
+        return self.frame[mask]
+
+
+    def average(self, by, **criteria):
+        """
+        Returns the mean distance and time of the rows selected by
+        criteria (see filter), grouped by the column(s) 'by'
+        """
+        return self.filter(**criteria).groupby(by, sort=False)[["distance", "time"]].mean().reset_index()
+
+
+
+def emptyFrame():
+    return typed(pd.DataFrame({column: [] for column in COLUMNS}))
+
+
+
+def typed(frame):
+    return frame.astype({"file": object, "distribution": object, "n": "Int64", "N": "Int64",
+                         "th": float, "k": float, "algo": object, "distance": float, "time": float})
+
+
+
+def parseFileName(fname):
+    """
+    Returns (distribution, n, N, th, k) encoded in a results file name
+    such as 'mallows_poisson_n10_N50_th0.1_k5.csv'. Files of real
+    datasets only have a distribution, 'real'.
+    """
+    tokens = fname[:-len(".csv")].split("_")
+    if tokens[0] != "mallows":
+        return "real", None, None, None, None
+
+    n = int(tokens[2][1:])
+    return tokens[1], n, int(tokens[3][1:]), float(tokens[4][2:]), float(tokens[5][1:]) / n
+
+
+
+def readResultsFile(directory, fname):
+    """
+    Reads a results file into rows of the index
+    """
+    results = pd.read_csv(os.path.join(directory, fname), skipinitialspace=True, usecols=[0, 1, 2])
+    results.columns = ["algo", "distance", "time"]
+
+    distribution, n, N, th, k = parseFileName(fname)
+    frame = pd.DataFrame({"file": fname, "distribution": distribution, "n": n, "N": N,
+                          "th": th, "k": k}, index=results.index)
+    return typed(pd.concat([frame, results], axis=1))
+
+
+
+def readStore(path):
+    """
+    Reads every row of a results store into rows of the index
+    """
+    store = results_store.ResultsStore(path)
+    rows = store.query()
+    store.close()
+
+    frame = pd.DataFrame({"file": rows["dataset"], "distribution": rows["distribution"], "n": rows["n"],
+                          "N": rows["N"], "th": rows["theta"], "k": rows["k"] / rows["n"],
+                          "algo": rows["algorithm"], "distance": rows["distance"],
+                          "time": rows["cpu_time"]})
+    return typed(frame)
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import numpy as np
+
+"""
+SQLite store for experiment results, one row per algorithm run. The
+database is opened in WAL mode with a generous busy timeout, so any
+number of concurrent sim.py processes can append to it, and rows are
+inserted in batches, one transaction per batch.
+"""
+
+DEFAULT_DATABASE = "results/results.sqlite"
+
+DEFAULT_BATCH_SIZE = 256
+
+BUSY_TIMEOUT = 60
+
+# (name, SQLite type, numpy dtype of the column returned by query)
+#
+# dataset: the results label, e.g. the PrefLib file name
+# distribution: 'poisson' or 'topk' for synthetic datasets, 'real' otherwise
+# theta and k are NULL (nan) for real datasets, epsilon for algorithms
+# without one and seed when no seed was given
+# cpu_time and wall_time are in milliseconds
+COLUMNS = (("dataset", "TEXT", object),
+           ("distribution", "TEXT", object),
+           ("n", "INTEGER", np.int64),
+           ("N", "INTEGER", np.int64),
+           ("theta", "REAL", np.float64),
+           ("k", "REAL", np.float64),
+           ("algorithm", "TEXT", object),
+           ("epsilon", "REAL", np.float64),
+           ("seed", "INTEGER", np.float64),
+           ("distance", "REAL", np.float64),
+           ("cpu_time", "REAL", np.float64),
+           ("wall_time", "REAL", np.float64))
+
+COLUMN_NAMES = tuple(name for name, _, _ in COLUMNS)
+
+# SQLite column names are case-insensitive, so n and N are
+# stored under other names
+SQL_NAMES = {"n": "candidates", "N": "voters"}
+
+def sqlName(name):
+    return SQL_NAMES.get(name, name)
+
+
+class ResultsStore:
+    """
+    Appends result rows to the SQLite database at 'path'.
+    Rows are buffered and written every 'batchSize' rows,
+    and when the store is flushed or closed.
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE, batchSize=DEFAULT_BATCH_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.batchSize = batchSize
+        self.pending = []
+
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f'"{sqlName(name)}" {kind}' for name, kind, _ in COLUMNS)
+        with self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS results ({columns})")
+
+
+    def add(self, **row):
+        """
+        Buffers a row, given as keyword arguments named after COLUMNS.
+        Missing columns are NULL.
+        """
+        unknown = set(row) - set(COLUMN_NAMES)
+        if unknown:
+            raise ValueError(f"unknown result columns {sorted(unknown)}")
+
+        self.pending.append(tuple(row.get(name) for name in COLUMN_NAMES))
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Writes the buffered rows in a single transaction
+        """
+        if len(self.pending) == 0:
+            return
+
+        placeholders = ", ".join("?" for _ in COLUMN_NAMES)
+        with self.connection:
+            self.connection.executemany(f"INSERT INTO results VALUES ({placeholders})", self.pending)
+        self.pending = []
+
+
+    def query(self, **filters):
+        """
+        Reads the rows whose columns equal the given keyword arguments,
+        e.g. query(n=10, algorithm="Copeland")
+        -------------------------------------
+
+        Returns
+            A dict mapping each column name to an np.array
+        """
+        unknown = set(filters) - set(COLUMN_NAMES)
+        if unknown:
+            raise ValueError(f"unknown result columns {sorted(unknown)}")
+
+        self.flush()
+
+        where = " AND ".join(f'"{sqlName(name)}" = ?' for name in filters)
+        statement = "SELECT * FROM results" + (f" WHERE {where}" if where else "")
+        rows = self.connection.execute(statement, tuple(filters.values())).fetchall()
+
+        columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        return {name: np.array([np.nan if value is None and dtype is not object else value
+                                for value in column], dtype=dtype)
+                for (name, _, dtype), column in zip(COLUMNS, columns)}
+
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception):
+        self.close()
@@ -1,8 +1,7 @@
 from os import system as sys
-from os import listdir
-from os.path import isfile, join
 
 import numpy as np
+import corpus
 
 # Parameter function excluded from main for accessibility from 
 # other files without excecuting main functionality
@@ -59,7 +58,11 @@ if __name__ == '__main__':
     # Total # real world datasets: 38, i.e. len(fnames) = 38
 
     PATH = '../data/soi/'
-    fnames = [f for f in listdir(PATH) if isfile(join(PATH, f))]
+    # Parses the files across all cores, which also fills the dataset
+    # cache each sim.py run below loads its file from (see corpus.py).
+    # Files that fail to parse are reported and skipped
+    datasets, errors = corpus.loadCorpus(PATH, warmOnly=True)
+    fnames = sorted(datasets)
 
     master += [f'python sim.py [FootRule+,RandomSort,Borda+,Score-Then-Borda+,Relaxed-Linear-Program,Local-Search,Chanas,Copeland,QS-Rand,QS-Det,IS,Opt] r {PATH}{fname} c {SEED}'
                 for fname in fnames
@@ -1,12 +1,15 @@
 import numpy as np
+import results_index
+import results_store
 
 from os import listdir
 from os.path import isfile, join
 
 class Search:
 
-    def __init__(self, directory):
+    def __init__(self, directory, store=results_store.DEFAULT_DATABASE):
         self.directory = directory
+        self.store = store
         self.fnames = []
         self.topk = []
 
@@ -20,52 +23,23 @@ class Search:
 
     
     def readData(self, dir):
-        file_names = self.getfilenames(dir)
-    
-        for f in file_names:
-            tokens = f.split("_")
-    
-            # if real dataset, ignore
-            if tokens[0] != "mallows":
-                continue
-            # if topk instead of poisson, append topk
-            if tokens[1] == "topk":
-                self.topk.append(f)
-                continue
-    
-            # process n
-            try:
-                curr_n = int(tokens[2][1:])
-            except:
-                print("Invalid n: ")
-                return
-            self.addToDict(self.ns, curr_n, f)
-    
-            # process N
-            try:
-                curr_N = int(tokens[3][1:])
-            except:
-                print("Invalid N: ")
-                return
-            self.addToDict(self.Ns, curr_N, f)
-    
-            # process th
-            try:
-                curr_th = float(tokens[4][2:])
-            except:
-                print("Invalid th: ")
-                return
-            self.addToDict(self.ths, curr_th, f)
-    
-            # process ks
-            try:
-                curr_k = float(tokens[5][1:-4]) / curr_n
-            except:
-                print("Invalid k: ")
-                return
-            self.addToDict(self.ks, curr_k, f)
+        # Parsing of file names and file contents is left to the
+        # results index, which is cached between sessions. Runs
+        # written to the results store (see sim.py) are included.
+        self.index = results_index.ResultsIndex(dir, store=self.store)
+        frame = self.index.frame
+
+        # only synthetic datasets, topk ones are kept aside
+        self.topk = sorted(frame.file[frame.distribution == "topk"].unique())
+        frame = frame[frame.distribution == "poisson"]
+
+        for label, d in (("n", self.ns), ("N", self.Ns), ("th", self.ths), ("k", self.ks)):
+            for value, files in frame.groupby(label).file:
+                d[value.item() if hasattr(value, "item") else value] = list(files.unique())
 
-            self.processAlgos(f) 
+        for algo, rows in frame.groupby("algo", sort=False):
+            self.algos[algo] = [f"{algo}, {distance}, {time}, {fname[:-4]}\n"
+                                for fname, distance, time in zip(rows.file, rows.distance, rows.time)]
 
 
 
@@ -81,22 +55,11 @@ class Search:
             d[k] = [v]
 
 
-    def processAlgos(self, fname):
-        # to be used by filtering by algorithm
-        with open(self.directory + fname) as f:
-            for line in f:
-                algo_label = line.strip().split(",")[0]
-                algo_val = line.strip("\n") + ", " + fname[:-4] + "\n"
-                self.addToDict(self.algos, algo_label, algo_val)
-
-
     def genericFilter(self, fnames):
         out_list = ["ALGORITHM, DISTANCE, TIME\n"]
-        for fname in fnames:
-            with open(self.directory + fname) as infile:
-                next(infile)
-                for line in infile:
-                    out_list.append(line)
+        rows = self.index.filter(file=list(fnames))
+        for algo, distance, time in zip(rows.algo, rows.distance, rows.time):
+            out_list.append(f"{algo}, {distance}, {time}\n")
         return out_list
 
 
@@ -0,0 +1,158 @@
+import os
+import numpy as np
+import preflib
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from sufficient_statistics import SufficientStatistics, pack
+
+"""
+Map-reduce construction of SufficientStatistics across processes. The
+top-lists are split into shards, by byte range of a PrefLib file or by
+key range of a Counter. Each worker folds its shard into a slot of a
+shared-memory array, and the slots are then summed pairwise in a tree
+reduction, log2(shards) rounds of parallel additions, all in place.
+
+Partial statistics can also be written with SufficientStatistics.save
+and combined later with SufficientStatistics.merge.
+"""
+
+
+def fromFile(path, shards=None, workers=None, chunkSize=preflib.DEFAULT_CHUNK_SIZE):
+    """
+    Builds the statistics of a PrefLib soi file from byte-range shards.
+    -------------------------------------
+
+    Params
+
+    'path': str
+            Path to the file
+
+    'shards': int
+            The number of byte ranges. Defaults to the number of workers.
+
+    'workers': int
+            The number of processes. Defaults to the number of cores.
+
+    'chunkSize': int
+            The bytes a worker reads at a time, see preflib.py
+    ------------------------------------
+
+    Returns
+        'statistics': SufficientStatistics
+
+        'N': int
+             The number of voters given by the file's header
+    """
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+
+    n, N, offset = preflib.readHeader(path)
+    bounds = np.linspace(offset, os.path.getsize(path), shards + 1).astype(np.int64).tolist()
+
+    tasks = [(foldFile, (path, start, end, chunkSize)) for start, end in zip(bounds[:-1], bounds[1:])]
+    return build(n, tasks, workers), N
+
+
+
+def fromCounter(data, n, shards=None, workers=None):
+    """
+    Builds the statistics of the top-lists in a Counter (see sim.py)
+    from shards of consecutive keys. Same parameters as fromFile.
+    """
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+
+    topLists = list(data.keys())
+    bounds = np.linspace(0, len(topLists), shards + 1).astype(np.int64).tolist()
+
+    tasks = [(foldPacked, pack({topList: data[topList] for topList in topLists[start:end]}))
+             for start, end in zip(bounds[:-1], bounds[1:])]
+    return build(n, tasks, workers)
+
+
+
+def build(n, tasks, workers):
+    """
+    Runs every (function, args) task in a worker, the task's index
+    being the slot its partial statistics are written to, then sums
+    the slots with a tree reduction and returns the total.
+    """
+    shards = len(tasks)
+    slotSize = 2 * n * n + 1
+
+    memory = shared_memory.SharedMemory(create=True, size=shards * slotSize * 8)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach,
+                                 initargs=(memory.name, shards, n)) as pool:
+            futures = [pool.submit(function, slot, *args) for slot, (function, args) in enumerate(tasks)]
+            for future in futures:
+                future.result()
+
+            # Round r adds slot i + 2^r into slot i, for every i divisible by 2^(r+1)
+            stride = 1
+            while stride < shards:
+                futures = [pool.submit(addSlot, i, i + stride)
+                           for i in range(0, shards - stride, 2 * stride)]
+                for future in futures:
+                    future.result()
+                stride *= 2
+
+        slots = np.ndarray((shards, slotSize), dtype=np.float64, buffer=memory.buf)
+        statistics = SufficientStatistics(n)
+        statistics.precedence = slots[0, :n * n].reshape(n, n).copy()
+        statistics.rankFrequency = slots[0, n * n:2 * n * n].reshape(n, n).copy()
+        statistics.N = slots[0, -1].item()
+        del slots
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return statistics
+
+
+
+def attach(name, shards, n):
+    """
+    Pool initializer: maps the parent's shared slots into this worker.
+    Slot i holds the flattened precedence and rank-frequency
+    matrices of shard i, followed by its N.
+    """
+    global sharedMemory, slots, sharedN
+    sharedMemory = shared_memory.SharedMemory(name=name)
+    slots = np.ndarray((shards, 2 * n * n + 1), dtype=np.float64, buffer=sharedMemory.buf)
+    sharedN = n
+
+
+
+def write(slot, statistics):
+    n = sharedN
+    slots[slot, :n * n] = statistics.precedence.ravel()
+    slots[slot, n * n:2 * n * n] = statistics.rankFrequency.ravel()
+    slots[slot, -1] = statistics.N
+
+
+
+def foldFile(slot, path, start, end, chunkSize):
+    """
+    Folds the top-lists starting in bytes [start, end) of a file
+    """
+    statistics = SufficientStatistics(sharedN)
+    for chunk in preflib.iterTopLists(path, chunkSize, start, end):
+        statistics.fold(*chunk)
+    write(slot, statistics)
+
+
+
+def foldPacked(slot, topLists, lengths, weights):
+    """
+    Folds packed top-lists, see sufficient_statistics.py
+    """
+    statistics = SufficientStatistics(sharedN)
+    statistics.fold(topLists, lengths, weights)
+    write(slot, statistics)
+
+
+
+def addSlot(target, source):
+    slots[target] += slots[source]
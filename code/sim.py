@@ -1,14 +1,20 @@
 import sys
 import os.path
 import ast
+import random
+import numpy as np
 import footrule, borda, scoreborda, random_sort, score_then_adjust, copeland
 import optimal, localsearch, chanas, relaxed_linear_program, score_then_adjust_relaxed
-import quick_sort_random, insertion_sort, quick_sort_det
+import multistart_localsearch, simulated_annealing, tabu_search
+import quick_sort_random, insertion_sort, quick_sort_det, kwiksort, lp_kwiksort
+import preflib, dataset_cache, results_store
 
 
 from os import path
+from time import perf_counter
 from collections import Counter
-from generate import MallowsSamplePoisson, MallowsSampleTopK
+from generate import MallowsSamplePoisson, MallowsSampleTopK, SAMPLER_VERSION
+from sufficient_statistics import TopLists
 
 
 """
@@ -58,6 +64,10 @@ The different choices that we provide are:
             iv. The top-lists being at line n+3, are newline separated from each other, and the
                 alternatives within each list are comman separated and ordered from left to right
 
+        c. 'rs' (real, streamed), same as 'r', except that the file is read in chunks straight
+        into the precedence and rank-frequency matrices (see preflib.py), so that files too
+        large to hold as top-lists can be aggregated. RandomSort is unavailable in this mode.
+
 
     2. What algorithm(s) the user would like to use for top-list rank aggregation:
         a. 'FootRule+'
@@ -74,6 +84,11 @@ The different choices that we provide are:
         l. 'QS-Det'
         m. 'IS'
         n. 'Opt'
+        o. 'KwikSort'
+        p. 'LP-KwikSort'
+        q. 'Multi-Start-Local-Search'
+        r. 'Simulated-Annealing'
+        s. 'Tabu-Search'
 
 
     3. Whether to run combinations of algorithms 'c' or not 'nc'. Combinations entails running Chanas and Local-Search as a postprocessing step for all algorithms (except opt).
@@ -87,6 +102,7 @@ The different choices that we provide are:
 
 		python3 sim.py [algo1,algo2,...,epsilon] s [n,N,theta,k] s0[OPTIONAL] c<OR>nc seed[OPTIONAL]
 		python3 sim.py [algo,algo2,...] r FILEPATH c<OR>nc seed[OPTIONAL]
+		python3 sim.py [algo,algo2,...] rs FILEPATH c<OR>nc seed[OPTIONAL]
 
 #### Examples:
 
@@ -119,11 +135,34 @@ class Simulation:
                         with their repective frequencies. Each top-list (tuple) is the key and 
                         the frequency of such list is the value (int) 
 
-            'params' : testing information to keep track of like n, N, k, s0, and seed
+            'params' : testing information to keep track of like n, N, k, s0, and seed.
+                       'repetitions' is the number of independent runs KwikSort
+                       and LP-KwikSort keep the best of. 'restarts', 'workers'
+                       and 'time_budget' (seconds) configure Multi-Start-Local-Search.
+                       'time_budget' also bounds Simulated-Annealing and Tabu-Search.
+                       'top' = k makes QS-Rand, QS-Det, IS, Borda+, Copeland and
+                       KwikSort order only the first k positions of their ranking.
+                       'cache' is the directory of the dataset cache (see
+                       dataset_cache.py), or None to always parse and generate anew.
+                       Least recently used entries are evicted once the cache exceeds
+                       'cache_bytes' bytes, or once unused for 'cache_age' seconds.
+                       'store' is the SQLite database results are written to (see
+                       results_store.py), or None to append them to the CSV file 'label'
+
+            'postProcessAlgos' : list of str
+                        algorithms run after every other algorithm when combinations
+                        are requested. Each must accept a starting sigma (see chanas.py)
+
+            'topListAlgos' : list of str
+                        algorithms that need the top-lists themselves rather than
+                        their sufficient statistics, so cannot run on streamed data
 
         """
         self.results = []
 
+        # (epsilon, wall-clock milliseconds) of each entry of self.results
+        self.runs = []
+
         self.funcDict = {
                 "FootRule+": footrule.run, 
                 "RandomSort": random_sort.run,
@@ -138,7 +177,12 @@ class Simulation:
                 "QS-Rand" : quick_sort_random.run,
                 "QS-Det" : quick_sort_det.run,
                 "IS" : insertion_sort.run,
-                "Opt" : optimal.run
+                "Opt" : optimal.run,
+                "KwikSort" : kwiksort.run,
+                "LP-KwikSort" : lp_kwiksort.run,
+                "Multi-Start-Local-Search" : multistart_localsearch.run,
+                "Simulated-Annealing" : simulated_annealing.run,
+                "Tabu-Search" : tabu_search.run
                 }
 
         self.data = None
@@ -151,13 +195,28 @@ class Simulation:
                 'theta': None,
                 's0': None,
                 'seed' : None,
-                'mallows_topk' : False
+                'mallows_topk' : False,
+                'repetitions' : 1,
+                'restarts' : multistart_localsearch.DEFAULT_RESTARTS,
+                'workers' : None,
+                'time_budget' : None,
+                'top' : None,
+                'cache' : dataset_cache.DEFAULT_CACHE_DIR,
+                'cache_bytes' : dataset_cache.DEFAULT_MAX_BYTES,
+                'cache_age' : dataset_cache.DEFAULT_MAX_AGE,
+                'store' : results_store.DEFAULT_DATABASE
                 }
 
         self.epsilons = list()
 
         self.combinations = None
 
+        self.streamed = False
+
+        self.postProcessAlgos = ["Chanas", "Local-Search"]
+
+        self.topListAlgos = ["RandomSort"]
+
 
     def __str__(self):
         """
@@ -186,7 +245,13 @@ class Simulation:
         (if doesn't exists already) and appends the comma separated string 
         '<distance>, <time>' as a line.
 
+        If params['store'] is given, the results are instead added to that database
+        (see results_store.py), along with the dataset's parameters, the seed, the
+        epsilon of Score-Then-Adjust variants and the wall-clock time of each run.
         """
+        if self.params['store'] is not None:
+            self.writeToStore()
+            return
 
         fname = f'{self.params["label"]}'
 
@@ -205,6 +270,25 @@ class Simulation:
         f.close()
 
 
+    def writeToStore(self):
+        """
+        Writes self.results to the results store params['store'], in one batch
+        """
+        real = self.params['theta'] is None
+        if real:
+            distribution = 'real'
+        else:
+            distribution = 'topk' if self.params['mallows_topk'] else 'poisson'
+
+        with results_store.ResultsStore(self.params['store']) as store:
+            for (name, distance, cpuTime), (epsilon, wallTime) in zip(self.results, self.runs):
+                store.add(dataset=path.basename(self.params['label']), distribution=distribution,
+                          n=self.params['n'], N=self.params['N'], theta=self.params['theta'],
+                          k=None if real else self.params['k'], algorithm=name, epsilon=epsilon,
+                          seed=self.params['seed'], distance=float(distance),
+                          cpu_time=cpuTime, wall_time=wallTime)
+
+
     def genMallows(self, params):
         """
         This method returns a object of type Counter in which input lists are stored
@@ -213,13 +297,49 @@ class Simulation:
 
         Note: this separate method was created in order to swtich between poisson and topk
               in the future
+
+        Seeded samples are cached (see dataset_cache.py) unless params['cache'] is None
+        """
+        cacheDir = params['cache']
+        if cacheDir is not None and params['seed'] is not None:
+            # params['k'] is the length of every top-list, or the lambda lengths are drawn from
+            generator = MallowsSampleTopK if params['mallows_topk'] else MallowsSamplePoisson
+            length = {'k' if params['mallows_topk'] else 'lda': params['k']}
+            key = dataset_cache.paramsKey(generator=generator.__name__, n=params['n'], N=params['N'],
+                    theta=params['theta'], s0=params['s0'], seed=params['seed'],
+                    sampler=SAMPLER_VERSION, **length)
+            cached = dataset_cache.load(key, cacheDir)
+            if cached is not None:
+                return cached[1]
+
+            sample = self.mallowsSample(params)
+            statistics = self.cacheStore(key, params, sample.packed())
+            return TopLists(sample.sample, statistics=statistics)
+
+        return self.mallowsSample(params).sample
+
+
+
+    def mallowsSample(self, params):
+        """
+        Draws the MallowsSample object (see generate.py) described by params
         """
         if params['mallows_topk']:
             return MallowsSampleTopK(params['N'], params['n'], params['k'],
-                    theta=params['theta'], s0=params['s0'], seed=params['seed']).sample
+                    theta=params['theta'], s0=params['s0'], seed=params['seed'])
         
         return MallowsSamplePoisson(params['N'], params['n'], params['k'], 
-                theta=params['theta'], s0=params['s0'], seed=params['seed']).sample
+                theta=params['theta'], s0=params['s0'], seed=params['seed'])
+
+
+
+    def cacheStore(self, key, params, data):
+        """
+        Stores a dataset in the cache, within the limits params['cache_bytes']
+        and params['cache_age'] (see dataset_cache.py), and returns its statistics
+        """
+        return dataset_cache.store(key, params['n'], params['N'], data, params['cache'],
+                                   params['cache_bytes'], params['cache_age'])
 
 
 
@@ -232,7 +352,17 @@ class Simulation:
 
         We also make sure to update N and n. Note: there is no ground truth s0 nor dispersion
         variable theta.
+
+        Parsed files are cached by content (see dataset_cache.py) unless params['cache'] is None
         """
+        cacheDir = self.params['cache']
+        if cacheDir is not None:
+            key = dataset_cache.fileKey(path)
+            cached = dataset_cache.load(key, cacheDir)
+            if cached is not None:
+                self.params['N'], c = cached
+                self.params['n'] = c.statistics.n
+                return c
 
         c = Counter()
 
@@ -266,9 +396,36 @@ class Simulation:
                 #assign count to ordering and put it in Counter object
                 c[toptuple] = frequency
 
+        if cacheDir is not None:
+            statistics = self.cacheStore(key, self.params, c)
+            c = TopLists(c, statistics=statistics)
+
         return c
 
 
+    def streamCSV(self, path):
+        """
+        Same as parseCSV, except that the file is streamed into a SufficientStatistics
+        object (see sufficient_statistics.py) instead of a Counter object.
+        """
+        cacheDir = self.params['cache']
+        if cacheDir is not None:
+            key = dataset_cache.fileKey(path)
+            cached = dataset_cache.load(key, cacheDir, topLists=False)
+            if cached is not None:
+                self.params['N'], statistics = cached
+                self.params['n'] = statistics.n
+                return statistics
+
+        statistics, self.params['N'] = preflib.readStatistics(path)
+        self.params['n'] = statistics.n
+
+        if cacheDir is not None:
+            self.cacheStore(key, self.params, statistics)
+
+        return statistics
+
+
     def handleFunc(self, algorithms):
         """
         This method runs all the algorithms specifies in the list 'self.algorithms'
@@ -280,38 +437,48 @@ class Simulation:
 
         """
 
-        def postProcess(data, params, preProcessAlgo, baseList, preTime):
-            postProcessAlgos = ["Chanas", "Local-Search"]
-
-            for postProcessAlgo in postProcessAlgos:
+        def postProcess(data, params, preProcessAlgo, baseList, preTime, preWallTime, epsilon=None):
+            for postProcessAlgo in self.postProcessAlgos:
                 if not postProcessAlgo == preProcessAlgo:
+                    wallStart = perf_counter()
                     _ , averageKendallTauDist, time, _ = self.funcDict[postProcessAlgo](data, params, baseList)
+                    wallTime = (perf_counter() - wallStart) * 1000
                     name = f"{preProcessAlgo}_{postProcessAlgo}"
                     self.results.append((name, averageKendallTauDist, preTime + time))
+                    self.runs.append((epsilon, preWallTime + wallTime))
 
         for func in algorithms:
             if func not in self.funcDict:
                 print(f'incorrect function name! {func} was not found')
+            if self.streamed and func in self.topListAlgos:
+                print(f'{func} needs the top-lists and cannot run on streamed data')
+                continue
             alg = self.funcDict[func]
 
             # special case where we are running top-k, must run for all epsilons
             if func == "Score-Then-Adjust" or func == "Score-Then-Adjust-Relaxed":
                 for epsilon in self.epsilons:
                     #passes Counter object dataset as well as data specs
+                    wallStart = perf_counter()
                     name, averageKendallTauDist, time, sigma  = alg(self.data, self.params, epsilon)
+                    wallTime = (perf_counter() - wallStart) * 1000
                     func = f"{name}-{epsilon}"
                     self.results.append((func, averageKendallTauDist, time))
+                    self.runs.append((epsilon, wallTime))
 
                     if self.combinations == 'c':
-                        postProcess(self.data, self.params, func, sigma, time)
+                        postProcess(self.data, self.params, func, sigma, time, wallTime, epsilon)
 
             # ordinary case
             else:
+                wallStart = perf_counter()
                 name, averageKendallTauDist, time, sigma = alg(self.data, self.params)
+                wallTime = (perf_counter() - wallStart) * 1000
                 self.results.append((name, averageKendallTauDist, time))
+                self.runs.append((None, wallTime))
 
                 if self.combinations == 'c' and not func == 'Opt':
-                        postProcess(self.data, self.params, func, sigma, time)
+                        postProcess(self.data, self.params, func, sigma, time, wallTime)
             
             
     def parseListArg(self, s):
@@ -362,10 +529,14 @@ class Simulation:
 
 
         # if real dataset
-        if args[1] == "r":
+        if args[1] == "r" or args[1] == "rs":
             # setting label according to file name if real data
             self.params['label'] +=  args[2].split("/")[-1]
-            self.data = self.parseCSV(args[2])
+            if args[1] == "rs":
+                self.streamed = True
+                self.data = self.streamCSV(args[2])
+            else:
+                self.data = self.parseCSV(args[2])
 
             self.combinations = args[3]
 
@@ -425,9 +596,14 @@ class Simulation:
             self.params['label'] += f'mallows_{distrb}_n{self.params["n"]}_N{self.params["N"]}_th{self.params["theta"]}_k{self.params["k"]}.csv'
 
         else:
-            print("wrong usage! second argument should be 'r' or 's'")
+            print("wrong usage! second argument should be 'r', 'rs' or 's'")
             return
 
+        # Seed the global random states for the algorithms that still draw from them,
+        # as a cached dataset (see genMallows) is loaded without drawing anything
+        np.random.seed(self.params['seed'])
+        random.seed(self.params['seed'])
+
         # run all functions
         self.handleFunc(algs)
 
@@ -0,0 +1,141 @@
+import time
+import utils
+import numpy as np
+
+ALGORITHM_NAME = "Simulated-Annealing"
+
+# Without a time budget, the search makes DEFAULT_SWEEPS * n moves
+DEFAULT_SWEEPS = 50
+
+# Temperatures are in units of the average Kendall Tau Distance,
+# where moving a candidate past one other candidate changes the
+# distance by at most 1
+START_TEMPERATURE = 1.0
+END_TEMPERATURE = 0.001
+
+def run(data, params, sigma=None):
+    """
+    Implements simulated annealing over insertion moves. Each move
+    takes a random candidate and re-inserts it at a position drawn
+    with probability proportional to exp(-cost / temperature) (a
+    heat-bath move), where all n + 1 positions are scored in O(n)
+    from the precedence matrix. The temperature cools geometrically
+    from params['start_temperature'] to params['end_temperature']
+    over params['sweeps'] * n moves, or over params['time_budget']
+    seconds if a budget is given. The best ranking visited is returned.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+
+    'sigma': list, tuple, or np.array of ints
+              The starting full ranking. A random permutation
+              if not given by a previous algorithm.
+    ------------------------------------
+
+    Returns
+
+    'AGORITHM_NAME': str
+                     The identifier for the algorithm implemented in
+                     this current file.
+
+    'time': float
+            Time if took for the main component of the algorithm to run
+
+    'acccuracy': float
+                 The generalized Kendall Tau Distance between the
+                 dataset top-lists and sigma
+
+    """
+    start_time = time.process_time()
+
+    # get data statistics/params
+    n = params['n']
+    N = params['N']
+    s0 = params['s0']
+
+    rng = np.random.default_rng(params['seed'])
+
+    # if sigma is not given by previous algorithm,
+    # make it a random starting permutation
+    if sigma is None:
+        sigma = rng.permutation(n)
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+
+    sigma = anneal(sigma, precedenceMatrix, N, rng,
+                   timeBudget=params.get('time_budget'),
+                   sweeps=params.get('sweeps', DEFAULT_SWEEPS),
+                   startTemperature=params.get('start_temperature', START_TEMPERATURE),
+                   endTemperature=params.get('end_temperature', END_TEMPERATURE))
+
+    sigma = tuple(sigma.tolist())
+
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+
+
+
+def anneal(sigma, precedenceMatrix, N, rng, timeBudget=None, sweeps=DEFAULT_SWEEPS,
+           startTemperature=START_TEMPERATURE, endTemperature=END_TEMPERATURE):
+    """
+    The annealing loop of run, starting from sigma. If timeBudget
+    (wall-clock seconds) is given, it replaces sweeps as the length
+    of the cooling schedule. Returns the best ranking visited as
+    an np.array.
+    """
+    n = len(sigma)
+    sigma = np.array(sigma)
+
+    cost = utils.precedenceKendallTauDistance(sigma, precedenceMatrix, 1)
+    best = sigma.copy()
+    bestCost = cost
+
+    totalMoves = sweeps * n
+    start = time.time()
+    moves = 0
+
+    while True:
+        if timeBudget is None:
+            progress = moves / totalMoves
+        else:
+            progress = (time.time() - start) / timeBudget
+        if progress >= 1:
+            break
+
+        temperature = startTemperature * (endTemperature / startTemperature) ** progress
+
+        i = rng.integers(n)
+        costs = utils.insertionCosts(sigma, i, precedenceMatrix)
+
+        # Heat-bath choice of the new position. Subtracting the minimum
+        # keeps every weight in (0, 1] with the best position at 1
+        weights = np.exp(-(costs - costs.min()) / (N * temperature))
+        cumulative = np.cumsum(weights)
+        newPosition = min(np.searchsorted(cumulative, rng.random() * cumulative[-1], side='right'), n)
+
+        # Positions i and i + 1 both leave the candidate where it is
+        if newPosition != i and newPosition != i + 1:
+            cand = sigma[i]
+            sigma = np.delete(sigma, i)
+            sigma = np.insert(sigma, newPosition if newPosition < i else newPosition - 1, cand)
+
+            cost += costs[newPosition] - costs[i]
+            if cost < bestCost:
+                best = sigma.copy()
+                bestCost = cost
+
+        moves += 1
+
+    return best
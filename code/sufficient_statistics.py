@@ -0,0 +1,268 @@
+import numpy as np
+from collections import Counter
+
+"""
+Every aggregator except RandomSort only looks at the top-lists through
+the precedence matrix and the rank-frequency matrix (see utils.py).
+SufficientStatistics holds just these two n x n matrices, so a dataset
+can be folded into them a chunk of top-lists at a time and the
+top-lists themselves never need to be held in memory.
+
+Top-lists are passed around packed into three flat np.arrays:
+
+    'candidates': the candidates of every top-list, concatenated
+    'lengths': the length of each top-list
+    'weights': the multiplicity of each top-list
+"""
+
+
+class TopLists(Counter):
+    """
+    A Counter of top-lists (see sim.py) that also carries their
+    SufficientStatistics, e.g. when both were loaded from the dataset
+    cache (see dataset_cache.py), so that utils.py need not recompute
+    them. The statistics must not be kept once the Counter is modified.
+    """
+
+    def __init__(self, *args, statistics=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statistics = statistics
+
+    def __reduce__(self):
+        # Counter's __reduce__ would drop the statistics
+        return self.__class__, (dict(self),), {'statistics': self.statistics}
+
+
+class SufficientStatistics:
+    """
+    The sufficient statistics of a top-list dataset over n candidates.
+    --------------------------------------
+
+    Attributes
+
+    'n': int
+         The number of candidates
+
+    'N': float
+         The total weight (number of voters) folded in so far
+
+    'precedence': 2D n x n np.array
+            precedence[i,j] is the number of voters ranking candidate i
+            before candidate j, as computed by utils.precedenceMatrix
+
+    'rankFrequency': 2D n x n np.array
+            rankFrequency[i,r] is the number of voters placing candidate i
+            in rank r, as computed by utils.alternativeRankFrequency
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.N = 0
+        self.precedence = np.zeros((n,n))
+        self.rankFrequency = np.zeros((n,n))
+
+
+    @classmethod
+    def fromCounter(cls, data, n):
+        """
+        Builds the statistics of the top-lists in a Counter (see sim.py)
+        """
+        statistics = cls(n)
+        statistics.fold(*pack(data))
+        return statistics
+
+
+    def fold(self, candidates, lengths, weights):
+        """
+        Adds a batch of packed top-lists to the statistics.
+        --------------------------------------
+
+        Params
+
+        'candidates': (L,) np.array of ints
+                The candidates of all top-lists, concatenated
+
+        'lengths': (B,) np.array of ints
+                The length of each of the B top-lists
+
+        'weights': (B,) np.array
+                The multiplicity of each top-list
+        """
+        n = self.n
+        candidates = np.asarray(candidates, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        self.N += np.sum(weights)
+        if len(candidates) == 0:
+            return
+
+        topList = np.repeat(np.arange(len(lengths)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        rank = np.arange(len(candidates)) - starts[topList]
+        weight = weights[topList]
+
+        self.rankFrequency += np.bincount(candidates * n + rank, weight, n * n).reshape(n,n)
+
+        # ranked[i] is the weight of the top-lists that rank i
+        ranked = np.bincount(candidates, weight, n)
+
+        # before[i,j] is the weight of the top-lists ranking i before j.
+        # Pairs are flushed into before whenever there are about n * n of them
+        before = np.zeros(n * n)
+        pairs, pairWeights, pending = [], [], 0
+        for first, second, pairWeight in orderedPairs(candidates, lengths, weights):
+            pairs.append(first * n + second)
+            pairWeights.append(pairWeight)
+            pending += len(first)
+
+            if pending >= n * n:
+                before += np.bincount(np.concatenate(pairs), np.concatenate(pairWeights), n * n)
+                pairs, pairWeights, pending = [], [], 0
+        if pending > 0:
+            before += np.bincount(np.concatenate(pairs), np.concatenate(pairWeights), n * n)
+        before = before.reshape(n,n)
+
+        # A ranked candidate precedes every other candidate,
+        # except those ranked before it
+        q = ranked[:, None] - before.T
+        np.fill_diagonal(q, 0)
+        self.precedence += q
+
+
+    def add(self, topList, weight=1):
+        """
+        Adds a single top-list with multiplicity weight in O(k * n),
+        where k is its length. A negative weight removes it.
+        """
+        topList = np.asarray(topList, dtype=np.int64)
+
+        self.N += weight
+        self.rankFrequency[topList, np.arange(len(topList))] += weight
+
+        # Each ranked candidate precedes every candidate
+        # other than itself and those ranked before it
+        for i, candidate in enumerate(topList):
+            row = self.precedence[candidate]
+            row += weight
+            row[topList[:i + 1]] -= weight
+
+
+    def copy(self):
+        statistics = SufficientStatistics(self.n)
+        statistics.N = self.N
+        statistics.precedence = np.array(self.precedence)
+        statistics.rankFrequency = np.array(self.rankFrequency)
+        return statistics
+
+
+    def save(self, path):
+        """
+        Writes the statistics to an .npz file, e.g. so that partial
+        statistics computed elsewhere can later be merged
+        """
+        np.savez(path, n=self.n, N=self.N, precedence=self.precedence,
+                 rankFrequency=self.rankFrequency)
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads statistics written by save
+        """
+        with np.load(path) as f:
+            statistics = cls(int(f['n']))
+            statistics.N = f['N'].item()
+            statistics.precedence = f['precedence']
+            statistics.rankFrequency = f['rankFrequency']
+        return statistics
+
+
+    def merge(self, other):
+        """
+        Adds the statistics of another dataset over the same candidates
+        """
+        if other.n != self.n:
+            raise ValueError(f"cannot merge statistics over {other.n} and {self.n} candidates")
+
+        self.N += other.N
+        self.precedence += other.precedence
+        self.rankFrequency += other.rankFrequency
+        return self
+
+
+
+def pack(data):
+    """
+    Packs the top-lists of a Counter (see sim.py) into the
+    (candidates, lengths, weights) arrays described above
+    """
+    topLists = list(data.keys())
+    lengths = np.array([len(topList) for topList in topLists], dtype=np.int64)
+    weights = np.array([data[topList] for topList in topLists], dtype=np.float64)
+
+    if len(topLists) == 0 or np.sum(lengths) == 0:
+        candidates = np.zeros(0, dtype=np.int64)
+    else:
+        candidates = np.concatenate([np.asarray(topList, dtype=np.int64) for topList in topLists])
+
+    return candidates, lengths, weights
+
+
+
+def orderedPairs(candidates, lengths, weights):
+    """
+    Yields every pair of candidates ranked by the same packed top-list,
+    gathered by the length k of the top-list and their distance d within
+    it, as three arrays: the candidates ranked first, those ranked second,
+    and the weights of their top-lists. A top-list of length k yields
+    k(k-1)/2 pairs, and no batch is larger than the top-lists of one
+    length, so a long top-list does not inflate the short ones.
+    """
+    if len(candidates) == 0:
+        return
+
+    starts = np.cumsum(lengths) - lengths
+
+    # the top-lists of each length, as the rows of one matrix
+    order = np.argsort(lengths, kind='stable')
+    groupLengths, groupStarts = np.unique(lengths[order], return_index=True)
+    groupEnds = np.append(groupStarts[1:], len(order))
+    for k, start, end in zip(groupLengths.tolist(), groupStarts.tolist(), groupEnds.tolist()):
+        if k < 2:
+            continue
+
+        group = order[start:end]
+        ranked = candidates[starts[group, None] + np.arange(k)]
+        for d in range(1, k):
+            yield ranked[:, :-d].ravel(), ranked[:, d:].ravel(), np.repeat(weights[group], k - d)
+
+
+
+def unpack(candidates, lengths, weights, statistics=None):
+    """
+    Inverse of pack: returns the top-lists as a TopLists Counter
+    """
+    ends = np.cumsum(lengths).tolist()
+    candidates = candidates.tolist()
+    weights = np.asarray(weights).tolist()
+
+    data = TopLists(statistics=statistics)
+    start = 0
+    for end, weight in zip(ends, weights):
+        data[tuple(candidates[start:end])] = int(weight) if float(weight).is_integer() else weight
+        start = end
+    return data
+
+
+
+def statisticsOf(data):
+    """
+    Returns the SufficientStatistics of data when they are already
+    known, i.e. when data is a SufficientStatistics object (including
+    FactoredStatistics, see factored_statistics.py) or a TopLists
+    Counter carrying them, and None otherwise
+    """
+    if isinstance(data, SufficientStatistics):
+        return data
+    return getattr(data, 'statistics', None)
@@ -0,0 +1,152 @@
+import time
+import utils
+import numpy as np
+
+ALGORITHM_NAME = "Tabu-Search"
+
+# Without a time budget, the search runs DEFAULT_ITERATIONS * n iterations
+DEFAULT_ITERATIONS = 10
+
+# Number of iterations a moved candidate may not be moved again
+DEFAULT_TENURE = 10
+
+# Number of candidates whose insertion moves are scored per iteration
+DEFAULT_SAMPLE = 32
+
+def run(data, params, sigma=None):
+    """
+    Implements tabu search over insertion moves. Every iteration
+    scores all insertion positions of params['sample'] random
+    candidates in O(n) each from the precedence matrix, and makes
+    the best move, even if it worsens the ranking. A moved candidate
+    is tabu (cannot move again) for params['tenure'] iterations
+    unless moving it gives the best ranking seen so far. The search
+    stops after params['iterations'] * n iterations, or after
+    params['time_budget'] seconds if a budget is given, and returns
+    the best ranking visited.
+    -------------------------------------
+
+    Params
+
+    'data': Counter object
+            The keys  in this Counter are tuple top-lists and the
+            values are the mulitiplicities of each top-list. Both
+            the elements in the tuples and the values are ints
+
+    'params': dict
+              A python dictionary with that holds statics and info
+              on the dataset stored on 'data'. Some of the keys are
+              'n', 'N', 'k', and 'theta'. Refer to sim.py for full
+              documentation.
+
+    'sigma': list, tuple, or np.array of ints
+              The starting full ranking. A random permutation
+              if not given by a previous algorithm.
+    ------------------------------------
+
+    Returns
+
+    'AGORITHM_NAME': str
+                     The identifier for the algorithm implemented in
+                     this current file.
+
+    'time': float
+            Time if took for the main component of the algorithm to run
+
+    'acccuracy': float
+                 The generalized Kendall Tau Distance between the
+                 dataset top-lists and sigma
+
+    """
+    start_time = time.process_time()
+
+    # get data statistics/params
+    n = params['n']
+    N = params['N']
+    s0 = params['s0']
+
+    rng = np.random.default_rng(params['seed'])
+
+    # if sigma is not given by previous algorithm,
+    # make it a random starting permutation
+    if sigma is None:
+        sigma = rng.permutation(n)
+
+    precedenceMatrix = utils.precedenceMatrix(data, n, compact=True)
+
+    sigma = tabuSearch(sigma, precedenceMatrix, rng,
+                       timeBudget=params.get('time_budget'),
+                       iterations=params.get('iterations', DEFAULT_ITERATIONS) * n,
+                       tenure=params.get('tenure', DEFAULT_TENURE),
+                       sample=params.get('sample', DEFAULT_SAMPLE))
+
+    sigma = tuple(sigma.tolist())
+
+    time_elapsed = (time.process_time() - start_time) * 1000
+
+    return ALGORITHM_NAME, utils.generalizedKendallTauDistance(data, sigma, n, N, s0), time_elapsed, sigma
+
+
+
+def tabuSearch(sigma, precedenceMatrix, rng, timeBudget=None, iterations=None,
+               tenure=DEFAULT_TENURE, sample=DEFAULT_SAMPLE):
+    """
+    The search loop of run, starting from sigma. If timeBudget
+    (wall-clock seconds) is given, it replaces iterations as the
+    stopping rule. Returns the best ranking visited as an np.array.
+    """
+    n = len(sigma)
+    sigma = np.array(sigma)
+
+    if iterations is None:
+        iterations = DEFAULT_ITERATIONS * n
+
+    cost = utils.precedenceKendallTauDistance(sigma, precedenceMatrix, 1)
+    best = sigma.copy()
+    bestCost = cost
+
+    # tabuUntil[c] is the first iteration in which candidate c may move again
+    tabuUntil = np.zeros(n, dtype=np.int64)
+    sampled = np.arange(min(sample, n))
+
+    start = time.time()
+    iteration = 0
+
+    while True:
+        if timeBudget is None:
+            if iteration >= iterations:
+                break
+        elif time.time() - start >= timeBudget:
+            break
+
+        positions = rng.choice(n, size=len(sampled), replace=False)
+        costs = utils.insertionCosts(sigma, positions, precedenceMatrix)
+        deltas = costs - costs[sampled, positions][:, None]
+
+        # Positions i and i + 1 both leave the candidate where it is
+        deltas[sampled, positions] = np.inf
+        deltas[sampled, positions + 1] = np.inf
+
+        tabu = tabuUntil[sigma[positions]] > iteration
+        allowed = ~tabu[:, None] | (cost + deltas < bestCost)
+        deltas = np.where(allowed, deltas, np.inf)
+
+        move = np.argmin(deltas)
+        row, newPosition = divmod(move, n + 1)
+
+        if np.isfinite(deltas[row, newPosition]):
+            i = positions[row]
+            cand = sigma[i]
+            sigma = np.delete(sigma, i)
+            sigma = np.insert(sigma, newPosition if newPosition < i else newPosition - 1, cand)
+
+            cost += deltas[row, newPosition]
+            tabuUntil[cand] = iteration + tenure + 1
+
+            if cost < bestCost:
+                best = sigma.copy()
+                bestCost = cost
+
+        iteration += 1
+
+    return best
@@ -1,4 +1,16 @@
 import utils
+import preflib
+import sharded_statistics
+from sufficient_statistics import SufficientStatistics, pack
+from factored_statistics import FactoredStatistics
+from tiled_statistics import TiledStatistics
+from windowed_statistics import DecayedStatistics, SlidingWindowStatistics
+from generate import MallowsSample
+import mallows_kendall as mk
+import os
+import itertools
+import tempfile
+import numpy as np
 
 def functionTester(func, tests):
     """
@@ -162,4 +174,313 @@ if __name__ == "__main__":
 
 
     # Testing generalizedKendallTauDistance
-    
\ No newline at end of file
+        
+    # Compared against hand-computed generalized distances
+    def precedenceDistance(topLists, sigma, n):
+        data = dict(topLists)
+        N = sum(data.values())
+        return utils.precedenceKendallTauDistance(sigma, utils.precedenceMatrix(data, n), N)
+
+    distanceTests = dict()
+
+    # One
+    name = "full list agreement"
+    distanceTests[((((0,1,2), 3),), (0,1,2), 3)] = (name, 0)
+
+    # Two
+
+    # (1,) is tau = (1,0,2): disagrees on 0 and 1
+    # (2,0) is tau = (2,0,1): disagrees on 0 and 2, 1 and 2
+    name = "top-lists with ties"
+    solution = (1 * 1 + 2 * 1) / 2
+    distanceTests[((((1,), 1), ((2,0), 1)), (0,1,2), 3)] = (name, solution)
+
+    results = functionTester(precedenceDistance, distanceTests)
+    outputTestResults(results)
+
+
+    # Testing insertionCosts against disagreements
+    def allDisagreements(topLists, ranking, oldPosition):
+        q = utils.precedenceMatrix(dict(topLists), len(ranking))
+        costs = utils.insertionCosts(ranking, oldPosition, q)
+        expected = [utils.disagreements(ranking, oldPosition, p, q) for p in range(len(ranking))]
+        return list(costs[:len(ranking)]) == expected
+
+    insertionTests = dict()
+
+    topLists = (((3,1), 2), ((0,), 1), ((2,3,4), 4))
+    for oldPosition in range(5):
+        name = f"insertion from position {oldPosition}"
+        insertionTests[(topLists, (4,0,3,1,2), oldPosition)] = (name, True)
+
+    results = functionTester(allDisagreements, insertionTests)
+    outputTestResults(results)
+
+
+    # Testing preflib.readStatistics against the Counter-based matrices
+    def streamedStatistics(lines, chunkSize):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("4\n1,a\n2,b\n3,c\n4,d\n7,7,4\n" + lines)
+        statistics, _ = preflib.readStatistics(f.name, chunkSize)
+        os.remove(f.name)
+
+        data = dict()
+        for line in lines.split("\n"):
+            if line:
+                parsedLine = [int(i) for i in line.split(",")]
+                data[tuple(i - 1 for i in parsedLine[1:])] = parsedLine[0]
+
+        return (np.array_equal(statistics.precedence, utils.precedenceMatrix(data, 4)) and
+                np.array_equal(statistics.rankFrequency, utils.alternativeRankFrequency(data, 4)))
+
+    streamTests = dict()
+
+    lines = "3,2,4\n1,1\n2,4,3,1,2\n1,3,1,4\n"
+    for chunkSize in (1, 5, 1 << 20):
+        name = f"streamed in chunks of {chunkSize} bytes"
+        streamTests[(lines, chunkSize)] = (name, True)
+
+    results = functionTester(streamedStatistics, streamTests)
+    outputTestResults(results)
+
+
+    # Testing SufficientStatistics.add against the Counter-based matrices
+    def incrementalStatistics(added, removed, n):
+        statistics = SufficientStatistics(n)
+        data = dict()
+        for topList, weight in added:
+            statistics.add(topList, weight)
+            data[topList] = data.get(topList, 0) + weight
+        for topList, weight in removed:
+            statistics.add(topList, -weight)
+            data[topList] -= weight
+
+        return (np.array_equal(statistics.precedence, utils.precedenceMatrix(data, n)) and
+                np.array_equal(statistics.rankFrequency, utils.alternativeRankFrequency(data, n)))
+
+    addTests = dict()
+
+    added = (((1,3), 2), ((0,), 1), ((2,3,4), 4), ((), 1))
+    addTests[(added, (), 5)] = ("single top-lists added", True)
+    addTests[(added, (((2,3,4), 3), ((0,), 1)), 5)] = ("single top-lists added and removed", True)
+
+    results = functionTester(incrementalStatistics, addTests)
+    outputTestResults(results)
+
+
+    # Testing FactoredStatistics against the Counter-based matrices and distance
+    def factoredStatistics(topLists, sigma, n):
+        data = dict(topLists)
+        N = sum(data.values())
+        statistics = FactoredStatistics.fromCounter(data, n)
+        q = statistics.precedence
+
+        return (np.array_equal(np.asarray(q), utils.precedenceMatrix(data, n)) and
+                np.array_equal(q[:, 2], utils.precedenceMatrix(data, n)[:, 2]) and
+                np.array_equal(statistics.rankFrequency, utils.alternativeRankFrequency(data, n)) and
+                np.isclose(utils.precedenceKendallTauDistance(sigma, q, N),
+                           utils.generalizedKendallTauDistance(data, sigma, n, N)))
+
+    factoredTests = dict()
+
+    topLists = (((3,1), 2), ((0,), 1), ((2,3,4), 4), ((), 1))
+    factoredTests[(topLists, (4,2,0,3,1), 5)] = ("short top-lists", True)
+    factoredTests[(topLists, (0,1,2,3,4,5,6,7), 8)] = ("unranked candidates", True)
+
+    results = functionTester(factoredStatistics, factoredTests)
+    outputTestResults(results)
+
+
+    # Testing the compact count type and compact matrices
+    def compactCounts(topLists, n):
+        data = dict(topLists)
+        q = utils.precedenceMatrix(data, n, compact=True)
+        p = utils.alternativeRankFrequency(data, n, compact=True)
+        return (q.dtype.name, np.array_equal(q, utils.precedenceMatrix(data, n)) and
+                np.array_equal(p, utils.alternativeRankFrequency(data, n)))
+
+    compactTests = dict()
+
+    compactTests[((((3,1), 2), ((0,), 1)), 4)] = ("small counts", ("uint16", True))
+    compactTests[((((3,1), 70000), ((0,), 1)), 4)] = ("counts beyond uint16", ("uint32", True))
+    compactTests[((((3,1), 0.5), ((0,), 1)), 4)] = ("fractional multiplicities", ("float64", True))
+
+    results = functionTester(compactCounts, compactTests)
+    outputTestResults(results)
+
+
+    # Testing TiledStatistics, with tiles not dividing n, against the Counter-based matrices
+    def tiledStatistics(topLists, sigma, n, tile):
+        data = dict(topLists)
+        N = sum(data.values())
+        with tempfile.TemporaryDirectory() as directory:
+            statistics = TiledStatistics(n, os.path.join(directory, "q.tiles"), tile)
+            for topList, weight in topLists:
+                statistics.add(topList, weight)
+            q = statistics.precedence
+
+            return (np.array_equal(np.asarray(q), utils.precedenceMatrix(data, n)) and
+                    np.array_equal(utils.pairwiseVictories(q),
+                                   utils.pairwiseVictories(utils.precedenceMatrix(data, n))) and
+                    np.isclose(utils.precedenceKendallTauDistance(sigma, q, N),
+                               utils.generalizedKendallTauDistance(data, sigma, n, N)))
+
+    tiledTests = dict()
+
+    topLists = (((3,1), 2), ((0,), 1), ((2,3,4), 4), ((), 1))
+    tiledTests[(topLists, (4,2,0,3,1), 5, 2)] = ("partial tiles", True)
+    tiledTests[(topLists, (0,1,2,3,4,5,6,7), 8, 8)] = ("a single tile", True)
+
+    results = functionTester(tiledStatistics, tiledTests)
+    outputTestResults(results)
+
+
+    # Testing statistics-only generation against the statistics of the full sample
+    def statisticsOnly(n, k_distribution, workers):
+        k_distribution = dict(k_distribution)
+        sample = MallowsSample(n, k_distribution, theta=0.5, seed=1)
+        statistics = SufficientStatistics(n)
+        statistics.fold(*sample.packed())
+
+        folded = MallowsSample(n, k_distribution, theta=0.5, seed=1, workers=workers,
+                               statisticsOnly=True).statistics
+        return (folded.N == statistics.N and np.array_equal(folded.precedence, statistics.precedence)
+                and np.array_equal(folded.rankFrequency, statistics.rankFrequency))
+
+    generationTests = dict()
+
+    generationTests[(6, ((2, 30), (4, 20)), 1)] = ("in process", True)
+    generationTests[(6, ((1, 5), (3, 10), (6, 15)), 2)] = ("two workers", True)
+
+    results = functionTester(statisticsOnly, generationTests)
+    outputTestResults(results)
+
+
+    # Testing the Fenwick-tree decomposition vectors against their definition,
+    # v[j] = the number of later items smaller than sigma[j], for sizes on and
+    # just past a power of two and, for the top-k conversion, every k
+    def decompositionVectors(n):
+        sigmas = np.array([np.random.default_rng(seed).permutation(n) for seed in range(4)])
+        def definition(sigma):
+            return [np.sum(sigma[j+1:] < sigma[j]) for j in range(n)]
+
+        V = mk.ranking_to_v(sigmas)
+        correct = (np.array_equal(V, [definition(sigma) for sigma in sigmas]) and
+                   np.array_equal(mk.v_to_ranking(V, n), sigmas) and
+                   np.array_equal(mk.ranking_to_v(sigmas[0]), V[0]) and
+                   np.array_equal(mk.v_to_ranking(V[0], n), sigmas[0]))
+
+        # a top-k conversion completes the first k items with the others in increasing order
+        for k in range(n + 1):
+            completed = [np.concatenate((sigma[:k], np.setdiff1d(np.arange(n), sigma[:k]))) for sigma in sigmas]
+            correct &= np.array_equal(mk.ranking_to_v(sigmas, k), [definition(sigma) for sigma in completed])
+        return bool(correct)
+
+    fenwickTests = dict()
+
+    for n in (1, 2, 7, 8, 9, 16, 17):
+        fenwickTests[(n,)] = (f"n = {n}", True)
+
+    results = functionTester(decompositionVectors, fenwickTests)
+    outputTestResults(results)
+
+
+    # Testing sampling_top_k_lists against exact top-k-list probabilities: every
+    # permutation sigma has weight exp(-theta * d(sigma, identity)), and its list is
+    # the first k items of s0^-1 o sigma o s0 (as in sampling_top_k_rankings), so
+    # sigma[:k] for the identity consensus
+    def topListProbabilities(n, k, theta, s0):
+        m = 100000
+        lists = mk.sampling_top_k_lists(m, n, k, theta, s0=None if s0 is None else np.array(s0), seed=0)
+        lists, counts = np.unique(lists, axis=0, return_counts=True)
+        sampled = dict(zip(map(tuple, lists.tolist()), counts / m))
+
+        s0 = np.arange(n) if s0 is None else np.array(s0)
+        exact = dict()
+        for sigma in itertools.permutations(range(n)):
+            sigma = np.array(sigma)
+            topList = tuple(np.argsort(s0)[sigma[s0[:k]]].tolist())
+            exact[topList] = exact.get(topList, 0) + np.exp(-theta * mk.kendall_tau(sigma))
+        Z = sum(exact.values())
+        return max(abs(sampled.get(topList, 0) - weight / Z) for topList, weight in exact.items()) < 0.01
+
+    samplingTests = dict()
+
+    samplingTests[(5, 3, 0.7, None)] = ("identity consensus", True)
+    samplingTests[(5, 3, 0.7, (2,0,4,1,3))] = ("other consensus", True)
+    samplingTests[(5, 5, 0.3, (4,3,2,1,0))] = ("full rankings", True)
+
+    results = functionTester(topListProbabilities, samplingTests)
+    outputTestResults(results)
+
+
+    # Testing windowed statistics: each tick is a tuple of (top-list, weight) pairs,
+    # the first added one at a time and the rest folded in packed, and every
+    # snapshot should equal the statistics of what is left of the window
+    def windowedStatistics(ticks, n, decay, buckets):
+        decayed = DecayedStatistics(n, decay)
+        window = SlidingWindowStatistics(n, buckets)
+        for t, topLists in enumerate(ticks):
+            if t > 0:
+                decayed.tick()
+                window.tick()
+            (first, weight), rest = topLists[0], dict(topLists[1:])
+            for statistics in (decayed, window):
+                statistics.add(first, weight)
+                statistics.fold(*pack(rest))
+
+        age = len(ticks) - 1
+        decayedData, windowData = dict(), dict()
+        for t, topLists in enumerate(ticks):
+            for topList, weight in topLists:
+                decayedData[topList] = decayedData.get(topList, 0) + weight * decay ** (age - t)
+                if age - t < buckets:
+                    windowData[topList] = windowData.get(topList, 0) + weight
+
+        def matches(snapshot, data):
+            return (np.isclose(snapshot.N, sum(data.values())) and
+                    np.allclose(snapshot.precedence, utils.precedenceMatrix(data, n)) and
+                    np.allclose(snapshot.rankFrequency, utils.alternativeRankFrequency(data, n)))
+
+        return bool(matches(decayed.snapshot(), decayedData) and matches(window.snapshot(), windowData))
+
+    windowedTests = dict()
+
+    ticks = ((((0,1), 2), ((2,), 1)), (((1,3,2), 1),), (((3,), 4), ((0,2), 1)))
+    windowedTests[(ticks, 4, 0.5, 3)] = ("window not full", True)
+    windowedTests[(ticks, 4, 0.9, 2)] = ("expired bucket", True)
+    windowedTests[(ticks, 4, 1, 1)] = ("last tick only", True)
+
+    results = functionTester(windowedStatistics, windowedTests)
+    outputTestResults(results)
+
+
+    # Testing sharded_statistics against preflib.readStatistics and the
+    # Counter-based matrices, with more shards than top-lists included
+    def shardedStatistics(lines, shards):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("4\n1,a\n2,b\n3,c\n4,d\n9,9,5\n" + lines)
+        sharded, _ = sharded_statistics.fromFile(f.name, shards, workers=2)
+        streamed, _ = preflib.readStatistics(f.name)
+        os.remove(f.name)
+
+        data = dict()
+        for line in lines.split("\n"):
+            if line:
+                parsedLine = [int(i) for i in line.split(",")]
+                data[tuple(i - 1 for i in parsedLine[1:])] = parsedLine[0]
+        counted = sharded_statistics.fromCounter(data, 4, shards, workers=2)
+
+        return all(np.array_equal(statistics.precedence, utils.precedenceMatrix(data, 4)) and
+                   np.array_equal(statistics.rankFrequency, utils.alternativeRankFrequency(data, 4)) and
+                   statistics.N == streamed.N
+                   for statistics in (sharded, counted, streamed))
+
+    shardTests = dict()
+
+    lines = "3,2,4\n1,1\n2,4,3,1,2\n1,3,1,4\n2,2\n"
+    for shards in (1, 3, 7, 64):
+        shardTests[(lines, shards)] = (f"{shards} shards", True)
+
+    results = functionTester(shardedStatistics, shardTests)
+    outputTestResults(results)
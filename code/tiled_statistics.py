@@ -0,0 +1,328 @@
+import os
+import weakref
+import tempfile
+import numpy as np
+import preflib
+
+from factored_statistics import FactoredStatistics
+
+"""
+Sufficient statistics for candidate sets whose n x n precedence matrix
+does not fit in memory. As in factored_statistics.py, q[i,j] is
+ranked[i] - before[j,i], but the transposed co-ranked counts
+
+    after[i,j] = before[j,i]
+
+are held dense in a memory-mapped file of 'tile' x 'tile' blocks. Block
+(I, J) holds rows I * tile, ... and columns J * tile, ... of after, and
+the blocks are laid out row of blocks by row of blocks, so that reading
+the matrix block by block (see TiledPrecedence.blocks) reads the file
+sequentially. Pairs folded in from a stream of top-lists are likewise
+written in file order, a batch at a time.
+"""
+
+DEFAULT_TILE = 1024
+
+
+def removeTiles(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class TiledPrecedence:
+    """
+    The precedence matrix q (see utils.precedenceMatrix) of a
+    TiledStatistics object. It answers q[i,j], rows q[i] and columns
+    q[:, j] like FactoredPrecedence, and its blocks() can be scanned
+    one tile at a time. np.asarray(q) builds the dense matrix.
+    """
+
+    def __init__(self, ranked, after, n):
+        self.ranked = ranked
+        self.after = after
+        self.tile = after.shape[2]
+        self.tiles = after.shape[0]
+
+        self.shape = (n, n)
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64)
+
+
+    def __len__(self):
+        return self.shape[0]
+
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            return self.row(key)
+
+        i, j = key
+        if isinstance(i, slice) and i == slice(None):
+            return self.column(j)
+        if np.ndim(i) == 0 and np.ndim(j) == 0:
+            if i == j:
+                return 0.0
+            t = self.tile
+            return self.ranked[i] - float(self.after[i // t, j // t, i % t, j % t])
+        if np.ndim(j) == 0:
+            return self.column(j)[i]
+        return self.row(i)[..., j]
+
+
+    def row(self, i):
+        """
+        q[i], or the rows q[i] stacked if i is an array
+        """
+        i = np.asarray(i)
+        n, t = self.shape[0], self.tile
+
+        rows = np.empty((i.size, n))
+        for r, candidate in enumerate(i.ravel().tolist()):
+            after = self.after[candidate // t, :, candidate % t, :].reshape(-1)[:n]
+            rows[r] = self.ranked[candidate] - after
+            rows[r, candidate] = 0
+        return rows.reshape(i.shape + (n,))
+
+
+    def column(self, j):
+        """
+        q[:, j], or the columns q[:, j] side by side if j is an array
+        """
+        j = np.asarray(j)
+        n, t = self.shape[0], self.tile
+
+        columns = np.empty((n, j.size))
+        for c, candidate in enumerate(j.ravel().tolist()):
+            after = self.after[:, candidate // t, :, candidate % t].reshape(-1)[:n]
+            columns[:, c] = self.ranked - after
+            columns[candidate, c] = 0
+        return columns.reshape((n,) + j.shape)
+
+
+    def block(self, I, J):
+        """
+        The tile of q with rows I * tile, ... and columns J * tile, ...
+        """
+        n, t = self.shape[0], self.tile
+        rows = slice(I * t, min((I + 1) * t, n))
+        columns = slice(J * t, min((J + 1) * t, n))
+
+        q = self.ranked[rows, None] - self.after[I, J, :rows.stop - rows.start, :columns.stop - columns.start]
+        if I == J:
+            np.fill_diagonal(q, 0)
+        return rows, columns, q
+
+
+    def blocks(self):
+        """
+        Yields every (rows, columns, tile) of q in file order
+        """
+        for I in range(self.tiles):
+            for J in range(self.tiles):
+                yield self.block(I, J)
+
+
+    def __array__(self, dtype=None, copy=None):
+        q = np.empty(self.shape)
+        for rows, columns, block in self.blocks():
+            q[rows, columns] = block
+        return q if dtype is None else q.astype(dtype)
+
+
+    def disagreements(self, sigma):
+        """
+        The total weight of the disagreements of the full ranking sigma
+        with the top-lists: q[i,j] voters disagree whenever j precedes
+        i in sigma. One sequential pass over the tiles.
+        """
+        position = np.empty(self.shape[0], dtype=np.int64)
+        position[np.asarray(sigma)] = np.arange(self.shape[0])
+
+        total = 0.0
+        for rows, columns, block in self.blocks():
+            total += np.sum(block[position[rows, None] > position[None, columns]])
+        return total
+
+
+    def symmetricBlocks(self):
+        """
+        Yields (rows, columns, q[rows, columns], q[columns, rows].T)
+        for every pair of tiles on or above the diagonal of tiles
+        """
+        for I in range(self.tiles):
+            for J in range(I, self.tiles):
+                rows, columns, upper = self.block(I, J)
+                yield rows, columns, upper, self.block(J, I)[2].T
+
+
+    def lowerBound(self):
+        """
+        The sum of min(q[a,b], q[b,a]) over all pairs of
+        candidates (see utils.pairwiseLowerBound)
+        """
+        bound = 0.0
+        for rows, columns, upper, lower in self.symmetricBlocks():
+            minimum = np.minimum(upper, lower)
+            bound += np.sum(np.triu(minimum, 1) if rows == columns else minimum)
+        return bound
+
+
+    def victories(self):
+        """
+        The number of candidates j with q[i,j] >= q[j,i] for every
+        candidate i, j = i included (see utils.pairwiseVictories)
+        """
+        victories = np.zeros(self.shape[0], dtype=np.int64)
+        for rows, columns, upper, lower in self.symmetricBlocks():
+            victories[rows] += np.sum(upper >= lower, axis=1)
+            if rows != columns:
+                victories[columns] += np.sum(lower >= upper, axis=0)
+        return victories
+
+
+
+class TiledStatistics(FactoredStatistics):
+    """
+    FactoredStatistics (see factored_statistics.py) whose co-ranked
+    counts are kept in a tiled memory-mapped file rather than a sparse
+    matrix. Accepted wherever SufficientStatistics are.
+    --------------------------------------
+
+    Params
+
+    'n': int
+         The number of candidates
+
+    'path': str
+         The file holding the tiles, created (or overwritten) here.
+         Defaults to a temporary file, which is deleted along with the
+         statistics, so a path must be given for them to be saved.
+
+    'tile': int
+         The side of a tile. A tile of tile * tile counts should be
+         large enough for sequential reads and small enough to fit in
+         cache.
+
+    'dtype': np.dtype
+         The type of the counts in the file, see utils.countDtype.
+         Top-lists can only be removed (see add) if it is a float type.
+    """
+
+    def __init__(self, n, path=None, tile=DEFAULT_TILE, dtype=np.float64):
+        super().__init__(n)
+        del self.coRanked, self.pending
+
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix=".tiles")
+            os.close(handle)
+            weakref.finalize(self, removeTiles, path)
+
+        self.path = path
+        tiles = -(-n // tile)
+        self.after = np.memmap(path, dtype=dtype, mode='w+', shape=(tiles, tiles, tile, tile))
+
+
+    @classmethod
+    def fromFile(cls, path, tilesPath=None, tile=DEFAULT_TILE, dtype=np.float64,
+                 chunkSize=preflib.DEFAULT_CHUNK_SIZE):
+        """
+        Streams a PrefLib soi file (see preflib.py) into tiled statistics.
+        -------------------------------------
+
+        Returns
+            'statistics': TiledStatistics
+
+            'N': int
+                 The number of voters given by the file's header
+        """
+        n, N, _ = preflib.readHeader(path)
+
+        statistics = cls(n, tilesPath, tile, dtype)
+        for chunk in preflib.iterTopLists(path, chunkSize):
+            statistics.fold(*chunk)
+        statistics.after.flush()
+
+        return statistics, N
+
+
+    @property
+    def precedence(self):
+        return TiledPrecedence(self.ranked, self.after, self.n)
+
+
+    def addPairs(self, pairs):
+        """
+        Adds the weights of (first, second) pairs to after[second, first],
+        visiting the tiles they fall in in file order
+        """
+        first, second, weights = (np.concatenate(arrays) for arrays in zip(*pairs))
+        t, tiles = self.after.shape[2], self.after.shape[0]
+
+        key = (second // t) * tiles + first // t
+        order = np.argsort(key, kind='stable')
+        key, first, second, weights = key[order], first[order], second[order], weights[order]
+
+        tileKeys, starts = np.unique(key, return_index=True)
+        ends = np.append(starts[1:], len(key))
+        for tileKey, start, end in zip(tileKeys.tolist(), starts.tolist(), ends.tolist()):
+            block = self.after[tileKey // tiles, tileKey % tiles].reshape(-1)
+            local = (second[start:end] % t) * t + first[start:end] % t
+            np.add.at(block, local, weights[start:end].astype(self.after.dtype))
+
+
+    def copy(self, path=None):
+        statistics = TiledStatistics(self.n, path, self.after.shape[2], self.after.dtype)
+        statistics.N = self.N
+        statistics.ranked = np.array(self.ranked)
+        statistics.rankCounts = np.array(self.rankCounts)
+        for I in range(self.after.shape[0]):
+            statistics.after[I] = self.after[I]
+        return statistics
+
+
+    def save(self, path):
+        """
+        Flushes the tiles and writes everything else to an .npz file,
+        which refers to the tiles by their path
+        """
+        self.after.flush()
+        np.savez(path, n=self.n, N=self.N, ranked=self.ranked, rankCounts=self.rankCounts,
+                 tiles=os.path.abspath(self.path), tile=self.after.shape[2], dtype=self.after.dtype.str)
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads statistics written by save, mapping their tiles again
+        """
+        with np.load(path) as f:
+            statistics = cls.__new__(cls)
+            statistics.n = int(f['n'])
+            statistics.N = f['N'].item()
+            statistics.ranked = f['ranked']
+            statistics.rankCounts = f['rankCounts']
+            statistics.path = str(f['tiles'])
+
+            tile, tiles = int(f['tile']), -(-statistics.n // int(f['tile']))
+            statistics.after = np.memmap(statistics.path, dtype=np.dtype(str(f['dtype'])), mode='r+',
+                                         shape=(tiles, tiles, tile, tile))
+        return statistics
+
+
+    def merge(self, other):
+        """
+        Adds tiled statistics of another dataset over the same
+        candidates and with the same tile size, a row of tiles at a time
+        """
+        if other.n != self.n:
+            raise ValueError(f"cannot merge statistics over {other.n} and {self.n} candidates")
+        if other.after.shape != self.after.shape:
+            raise ValueError("cannot merge statistics with different tile sizes")
+
+        self.N += other.N
+        self.ranked = self.ranked + other.ranked
+        self.reserveRanks(other.rankCounts.shape[1])
+        self.rankCounts[:, :other.rankCounts.shape[1]] += other.rankCounts
+        for I in range(self.after.shape[0]):
+            self.after[I] += other.after[I]
+        return self
@@ -1,6 +1,9 @@
 import numpy as np
 import heapq 
 import itertools
+from sufficient_statistics import statisticsOf
+from factored_statistics import FactoredPrecedence
+from tiled_statistics import TiledPrecedence
 
 def generalizedKendallTauDistance(data, sigma, n, N, s0=None):
     """
@@ -19,7 +22,10 @@ def generalizedKendallTauDistance(data, sigma, n, N, s0=None):
     'data': Counter object 
             The keys  in this Counter are tuple top-lists and the 
             values are the mulitiplicities of each top-list. Both 
-            the elements in the tuples and the values are ints
+            the elements in the tuples and the values are ints.
+            May also be a SufficientStatistics object (or a TopLists
+            Counter carrying one), in which case the distance is
+            computed from its precedence matrix
 
     'sigma': int tuple
              A single full ranking returned by some algorithm
@@ -54,6 +60,10 @@ def generalizedKendallTauDistance(data, sigma, n, N, s0=None):
                 has many application beyond voting theory
 
     """
+    statistics = statisticsOf(data)
+    if statistics is not None:
+        return precedenceKendallTauDistance(sigma, statistics.precedence, N)
+
     # sum_{i=1}^N K(sigma, tau_i) / N
     cost = 0
     for x in data:
@@ -62,6 +72,94 @@ def generalizedKendallTauDistance(data, sigma, n, N, s0=None):
     return cost / N
 
 
+def precedenceKendallTauDistance(sigma, precedenceMatrix, N):
+    """
+    Computes the same average generalized Kendall Tau Distance as
+    generalizedKendallTauDistance, but from the precedence matrix
+    instead of the top-lists. A top-list disagrees with sigma on
+    candidates a and b (a before b in sigma) exactly when it ranks b
+    before a, whether or not a is ranked, so the total cost is the sum
+    of q[b,a] over all such pairs.
+    --------------------------------
+
+    Params
+
+    'sigma': int tuple
+             A single full ranking
+
+    'precedenceMatrix': 2D n x n np.array, FactoredPrecedence or TiledPrecedence
+             See precedenceMatrix below
+
+    'N': int
+         The total number of voters in this instance dataset
+    --------------------------------
+
+    Returns
+
+        'cost': float
+    """
+    if isinstance(precedenceMatrix, (FactoredPrecedence, TiledPrecedence)):
+        return precedenceMatrix.disagreements(sigma) / N
+
+    order = np.asarray(sigma)
+    q = precedenceMatrix[np.ix_(order, order)]
+    # entry [x,y] with x > y is q[sigma[x], sigma[y]]: sigma[y] is placed
+    # first, so the voters preferring sigma[x] disagree with sigma
+    return np.sum(np.tril(q, -1)) / N
+
+
+def pairwiseLowerBound(precedenceMatrix, N):
+    """
+    A lower bound on the average generalized Kendall Tau Distance of
+    any full ranking: whichever way a ranking orders candidates a and
+    b, at least min(q[a,b], q[b,a]) top-lists disagree with it.
+    --------------------------------
+
+    Params
+
+    'precedenceMatrix': 2D n x n np.array, FactoredPrecedence or TiledPrecedence
+             See precedenceMatrix below
+
+    'N': int
+         The total number of voters in this instance dataset
+    --------------------------------
+
+    Returns
+
+        'bound': float
+    """
+    if isinstance(precedenceMatrix, (FactoredPrecedence, TiledPrecedence)):
+        return precedenceMatrix.lowerBound() / N
+
+    q = np.asarray(precedenceMatrix)
+    return np.sum(np.triu(np.minimum(q, q.T), 1)) / N
+
+
+
+def pairwiseVictories(precedenceMatrix):
+    """
+    Counts, for every candidate i, the candidates j that i beats or
+    ties in their pairwise contest, q[i,j] >= q[j,i], with j = i
+    included. These are the scores of the Copeland method.
+    --------------------------------
+
+    Params
+
+    'precedenceMatrix': 2D n x n np.array, FactoredPrecedence or TiledPrecedence
+             See precedenceMatrix below
+    --------------------------------
+
+    Returns
+
+        A (n,) np.array of ints
+    """
+    if isinstance(precedenceMatrix, TiledPrecedence):
+        return precedenceMatrix.victories()
+
+    q = np.asarray(precedenceMatrix)
+    return np.sum(q >= q.T, axis=1)
+
+
 def kendall_tau(rank_a,rank_b):
 
     """Calculates the Kendall Tau distance.
@@ -117,7 +215,7 @@ def piToTau(pi, sigma):
 
 
 
-def precedenceMatrix(data, n):
+def precedenceMatrix(data, n, dense=True, compact=False):
     """
     This functions computes the n by n precedence matrix 'q', where q[i,j] is the 
     number of top-lists for which candidate i is ranked before candidate j.
@@ -130,10 +228,25 @@ def precedenceMatrix(data, n):
     'data': Counter object 
             The keys  in this Counter are tuple top-lists and the 
             values are the mulitiplicities of each top-list. Both 
-            the elements in the tuples and the values are ints
+            the elements in the tuples and the values are ints.
+            May also be a SufficientStatistics object (or a TopLists
+            Counter carrying one)
 
     'n': int
          The number of candidates, which is also the number of ranks
+
+    'dense': bool
+         If False, the statistics' own precedence matrix is returned
+         as is, uncopied, which may be a FactoredPrecedence or a
+         TiledPrecedence (see factored_statistics.py and
+         tiled_statistics.py). Only for callers that index it
+         with q[i,j], q[i] and q[:, j] and never modify it.
+
+    'compact': bool
+         If True, the counts are stored in the smallest unsigned
+         integer type that holds them (see countDtype below) when the
+         multiplicities are all integers. Only for callers that never
+         subtract counts from one another.
     ---------------------------------------
 
     Returns 
@@ -142,7 +255,15 @@ def precedenceMatrix(data, n):
             Precedence matrix specifying how often candidates 
             appear before other candidates.
     """
-    q = np.zeros((n,n))
+    statistics = statisticsOf(data)
+    if statistics is not None:
+        if not dense:
+            return statistics.precedence
+        if compact:
+            return compactCounts(statistics.precedence, statistics.N)
+        return np.array(statistics.precedence)
+
+    q = np.zeros((n,n), dtype=countDtype(data) if compact else np.float64)
     allCandidates = {i for i in range(n)}
 
     for topList in data:
@@ -224,7 +345,44 @@ def disagreements(fullRanking, oldPosition, newPosition, precedenceMatrix):
 
 
 
-def alternativeRankFrequency(data, n):
+def insertionCosts(fullRanking, oldPosition, precedenceMatrix):
+    """
+    Computes disagreements(fullRanking, oldPosition, newPosition,
+    precedenceMatrix) for every newPosition at once using prefix
+    sums, in O(n) total rather than O(n) per position.
+    --------------------------------------
+
+    Params
+
+    Same as disagreements, except that oldPosition may also
+    be an array of B positions, which are evaluated together
+    ---------------------------------------
+
+    Returns
+        A (n+1,) np.array whose entry newPosition is the
+        disagreements of placing the candidate just before
+        fullRanking[newPosition]. The last entry places it
+        after every candidate. A (B, n+1) np.array if
+        oldPosition is an array.
+    """
+    order = np.asarray(fullRanking)
+    candidate = order[oldPosition]
+
+    # Voters preferring candidate to each other candidate
+    # (a disagreement when the other candidate precedes it)
+    # and vice versa
+    preferred = np.cumsum(precedenceMatrix[candidate][..., order], axis=-1)
+    dispreferred = np.cumsum(precedenceMatrix[:, candidate][order].T, axis=-1)
+
+    zeros = np.zeros(preferred.shape[:-1] + (1,))
+    preferred = np.concatenate((zeros, preferred), axis=-1)
+    dispreferred = np.concatenate((zeros, dispreferred), axis=-1)
+
+    return preferred + (dispreferred[..., -1:] - dispreferred)
+
+
+
+def alternativeRankFrequency(data, n, compact=False):
     """
     This functions computes an n by n matrix 'p' where p[i,j] is the number of
     voters that placed candidate i in rank j.
@@ -235,10 +393,15 @@ def alternativeRankFrequency(data, n):
     'data': Counter object 
             The keys  in this Counter are tuple top-lists and the 
             values are the mulitiplicities of each top-list. Both 
-            the elements in the tuples and the values are ints
+            the elements in the tuples and the values are ints.
+            May also be a SufficientStatistics object (or a TopLists
+            Counter carrying one)
 
     'n': int
          The number of candidates, which is also the number of ranks
+
+    'compact': bool
+         See precedenceMatrix above
     ---------------------------------------
 
     Returns 
@@ -251,7 +414,13 @@ def alternativeRankFrequency(data, n):
     # initialize n by n array for occurence of each alternatives on each rank
     # the rows are the alternatives and the columns are the ranks
     # note: if no candidate ever appears in some rank, then then stays 0
-    p = np.zeros((n,n))
+    statistics = statisticsOf(data)
+    if statistics is not None:
+        if compact:
+            return compactCounts(statistics.rankFrequency, statistics.N)
+        return np.array(statistics.rankFrequency)
+
+    p = np.zeros((n,n), dtype=countDtype(data) if compact else np.float64)
 
     # loop over all the keys (top-lists) in data
     for x in data:
@@ -270,6 +439,71 @@ def alternativeRankFrequency(data, n):
 
 
 
+def countDtype(data):
+    """
+    The smallest unsigned integer type (uint16, uint32 or uint64) that
+    can hold any count of voters in data, i.e. its total multiplicity
+    N, or float64 if some multiplicity is not an integer.
+    --------------------------------------
+
+    Params
+
+    'data': Counter object, SufficientStatistics object or number
+            The top-lists (see precedenceMatrix), or N itself
+    --------------------------------------
+
+    Returns
+        A np.dtype
+    """
+    statistics = statisticsOf(data)
+    if statistics is not None:
+        weights = [statistics.N]
+    elif isinstance(data, dict):
+        weights = data.values()
+    else:
+        weights = [data]
+
+    if not all(float(weight).is_integer() and weight >= 0 for weight in weights):
+        return np.dtype(np.float64)
+
+    N = sum(int(weight) for weight in weights)
+    for dtype in (np.uint16, np.uint32, np.uint64):
+        if N <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+
+def compactCounts(matrix, N):
+    """
+    Returns a copy of a matrix of voter counts in countDtype(N), or
+    in float64 if some entry is fractional (e.g. decayed statistics,
+    see windowed_statistics.py)
+    """
+    matrix = np.asarray(matrix)
+    counts = matrix.astype(countDtype(N))
+    if np.issubdtype(counts.dtype, np.integer) and not np.array_equal(counts, matrix):
+        return np.array(matrix, dtype=np.float64)
+    return counts
+
+
+
+def rankCounts(data, n, compact=False):
+    """
+    Same as alternativeRankFrequency, except that statistics holding
+    only the ranks some top-list reaches (see factored_statistics.py)
+    return just those first k columns, as an n x k np.array
+    """
+    statistics = statisticsOf(data)
+    if statistics is not None and hasattr(statistics, 'rankCounts'):
+        if compact:
+            return compactCounts(statistics.rankCounts, statistics.N)
+        return np.array(statistics.rankCounts)
+
+    return alternativeRankFrequency(data, n, compact)
+
+
+
 def scores(data, n, N):
     """
     Computes the probability that a candidate is ranked
@@ -282,7 +516,7 @@ def scores(data, n, N):
     Returns
         A (n,) numpy array corresponding to the score of each candidate
     """
-    return np.sum(alternativeRankFrequency(data,n), axis=1) / N
+    return np.sum(rankCounts(data, n, compact=True), axis=1) / N
 
 
 
@@ -323,29 +557,52 @@ def avgRanks(data, n, N):
         A (n,) np.array of each candidate's average rank. A float('inf') is for
         candidates that never appear in the input list
     """
-    # get scores of all candidates
-    sc = scores(data, n, N)
-    # get rank frequency for all candidates (and convert to prob by / N)
-    freqs = alternativeRankFrequency(data,n) / N
+    # get rank frequency counts for all candidates. Normalizing
+    # by the number of voters ranking each candidate, rather than
+    # by N first, gives the same ranks without a divided copy
+    counts = rankCounts(data, n, compact=True)
     # [1, 2, 3, ..., n] used to multiply sum element
-    r = np.arange(1, n+1)
-
-    #initialize empty 1D (n,) np.array
-    ranks = np.empty((n,))
-
-    for i in range(n):
-        # if candidate doesn't even appear once, rank is infinity
-        if sc[i] == 0:
-            ranks[i] = float('inf')
-        # formula above
-        else:
-            ranks[i] = np.sum((freqs[i] / sc[i]) * r)
-        
+    r = np.arange(1, counts.shape[1]+1)
+
+    # if candidate doesn't even appear once, rank is infinity
+    ranked = np.sum(counts, axis=1)
+    ranks = np.full((n,), float('inf'))
+    ranks[ranked > 0] = (counts[ranked > 0] @ r) / ranked[ranked > 0]
+
     return ranks
 
 
 
 
+def topArgsort(keys, top=None):
+    """
+    Same as np.argsort(keys, kind='stable'), except that when top is
+    given only the top smallest keys are sorted, after an O(n)
+    np.argpartition. The remaining indices follow in arbitrary order.
+    ----------------------------
+
+    Params
+        'keys': (n,) np.array
+
+        'top': int
+               At least one. Everything is sorted if not given.
+    ----------------------------
+
+    Returns
+        A (n,) np.array of indices into keys
+    """
+    keys = np.asarray(keys)
+    if top is None or top >= len(keys):
+        return np.argsort(keys, kind='stable')
+
+    partitioned = np.argpartition(keys, top - 1)
+    head = np.sort(partitioned[:top])
+    head = head[np.argsort(keys[head], kind='stable')]
+    return np.concatenate((head, partitioned[top:]))
+
+
+
+
 def lineGenerator(length):
     line = ""
     for i in range(length):
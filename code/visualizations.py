@@ -1,32 +1,49 @@
+import os
 import numpyfy
-import search
+import results_store
 import numpy as np
 import plotnine as plt
 import pandas as pd
 from adjustText import adjust_text
+from concurrent.futures import ProcessPoolExecutor
 
 dpi = 300
 fileType = ".jpeg"
 syntheticDirectory = "../Synthetic-Results/"
 realDirectory = "../Real-World-Results/"
 
+def paretoFront(costs, times):
+    # Boolean mask of the points not dominated by any other point,
+    # where lower cost and lower time are better. After sorting by
+    # cost (then time), a point is dominated iff an earlier point has
+    # a lower time, or an equal time and a strictly lower cost
+    costs = np.asarray(costs, dtype=float)
+    times = np.asarray(times, dtype=float)
+    if len(costs) == 0:
+        return np.zeros(0, dtype=bool)
+
+    order = np.lexsort((times, costs))
+    sortedCosts, sortedTimes = costs[order], times[order]
+
+    bestTime = np.minimum.accumulate(sortedTimes)
+    bestEarlierTime = np.concatenate(([np.inf], bestTime[:-1]))
+
+    # best time among points with a strictly lower cost
+    firstOfCost = np.searchsorted(sortedCosts, sortedCosts, side='left')
+    bestCheaperTime = np.where(firstOfCost > 0, bestTime[firstOfCost - 1], np.inf)
+
+    dominated = (bestEarlierTime < sortedTimes) | (bestCheaperTime <= sortedTimes)
+
+    front = np.empty(len(costs), dtype=bool)
+    front[order] = ~dominated
+    return front
+
 def paretoFilterDict(data):
-    nonDominated = dict()
-
-    for algo, info in data.items():
-        dist, time = info
-        dominated = False
-        for _ , info2 in data.items():
-            dist2, time2 = info2
-            # > / >= because having a higher 
-            # time or distance is worse
-            if time >= time2 and dist >= dist2:
-                if time > time2 or dist > dist2:
-                    dominated = True
-        if not dominated:
-            nonDominated[algo] = (dist, time)
-            
-    return nonDominated
+    algorithms = list(data.keys())
+    dists, times = zip(*data.values()) if data else ((), ())
+    front = paretoFront(dists, times)
+
+    return {algo: data[algo] for algo, keep in zip(algorithms, front) if keep}
 
 def infoForAlg(data):
         totalAccuracy = 0
@@ -41,13 +58,12 @@ def infoForAlg(data):
         return (totalAccuracy / numPoints, totalTime / numPoints)
 
 def paretoByAllData():
-    s = search.Search(syntheticDirectory)
-    averages = dict()
+    # Averages over all synthetic results, see numpyfy.py
+    rows = numpyfy.index.filter(distribution="poisson", algo=numpyfy.algorithms)
+    means = rows.groupby("algo", sort=False)[["distance", "time"]].mean()
 
-    for algo in numpyfy.algorithms:
-        _, fileName = s.filter_by_algo(algo)
-        data = np.genfromtxt(fileName, delimiter = ",", skip_header = 1)
-        averages[algo] = infoForAlg(data)
+    averages = {algo: (means.distance[algo], means.time[algo])
+                for algo in numpyfy.algorithms if algo in means.index}
     return paretoFilterDict(averages)
 
 def barChart(x, y, groupBy, df):
@@ -91,39 +107,13 @@ def scatterPlot(x, y, groupBy, df):
     return plot
 
 def paretoFilterDf(df):
-    rows, columns = df.shape
-    dominatedAlgorithms = list()
-
-    for i in range(rows):
-        dominated = False
-
-        for j in range(rows):
-            numWorse = 0
-            numBetter = 0
-
-            for k in range(1, columns):
-                if df.iloc[i,k] > df.iloc[j,k]:
-                    numWorse += 1
-                elif df.iloc[i,k] < df.iloc[j,k]:
-                    numBetter += 1 
-                    break
-
-            if  numWorse > 0 and numBetter == 0:
-                    dominated = True
-                    break
-
-        if dominated:
-            algorithm = df.iloc[i,0]
-            dominatedAlgorithms.append(algorithm)
-    
-    for algorithm in dominatedAlgorithms:
-        df = df[df.Algorithms != algorithm]
-
-    return df
+    # Keeps the rows of the Pareto front of the second and
+    # third columns (cost and time), see paretoFront
+    return df[paretoFront(df.iloc[:, 1], df.iloc[:, 2])]
     
 
 def normalizedData(df):
-    minScore = df.min()[1]
+    minScore = df.min().iloc[1]
     df['DISTANCE'] = df['DISTANCE'] / minScore 
     df.columns = ['Algorithms','Cost', 'Time (CPU Seconds)']
     return df
@@ -137,40 +127,33 @@ def dictToDfFormat(data):
         return out
 
 def collapseDuplicates(df):
-    # Value is a tuple: totalDist, totalTime, number of data-points
-    includedAlgorithms = dict()
-    
-    rows, _ = df.shape 
-
-    for i in range(0,rows):
-        algorithm = df.iloc[i,0]
-
-        if algorithm not in includedAlgorithms:
-            includedAlgorithms[algorithm] = (df.iloc[i,1], df.iloc[i,2], 1)
-        else:
-            dist, time, num = includedAlgorithms[algorithm]
-
-            distTotal = dist +  df.iloc[i,1]
-            timeTotal = time +  df.iloc[i,2]
-        
-            includedAlgorithms[algorithm] = (distTotal, timeTotal, num + 1)
-
-    toConvert = dict()
-    for algorithm, info in includedAlgorithms.items():
-        dist, time, num = info 
-        # To ensure float division
-        num = float(num)
-        toConvert[algorithm] = (dist / num, time / num)
-    
+    # Averages the distance and time of rows with the same
+    # algorithm, keeping algorithms in order of first appearance
     header = df.columns.values.tolist()
-    return pd.DataFrame(dictToDfFormat(toConvert), columns=header)
+    return df.groupby(header[0], sort=False)[header[1:]].mean().reset_index()
+
+
+def fileResults(fileName, folder, store=results_store.DEFAULT_DATABASE):
+    # The ALGORITHM, DISTANCE, TIME rows of a dataset, from its results
+    # file in folder and from the runs of the results store, if either exists
+    frames = []
+    if os.path.exists(f"{folder}{fileName}"):
+        # Handles spaces
+        sep="\\s*,\\s*"
+        engine = "python"
+        frames.append(pd.read_csv(f"{folder}{fileName}", sep=sep, engine=engine))
 
+    if store is not None and os.path.exists(store):
+        with results_store.ResultsStore(store) as results:
+            rows = results.query(dataset=fileName)
+        frames.append(pd.DataFrame({"ALGORITHM": rows["algorithm"], "DISTANCE": rows["distance"],
+                                    "TIME": rows["cpu_time"]}))
 
-def fileComparison(fileName, folder):
-    # Handles spaces
-    sep="\\s*,\\s*"
-    engine = "python"
-    data = pd.read_csv(f"{folder}{fileName}", sep=sep, engine=engine)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fileComparison(fileName, folder, store=results_store.DEFAULT_DATABASE):
+    data = fileResults(fileName, folder, store)
     data = normalizedData(data)
     data = collapseDuplicates(data)
     data = paretoFilterDf(data)
@@ -200,15 +183,17 @@ def overallComparison():
     scatterPlot(x,y,groupBy,data).save(f"Overall Algorithm Comparison{fileType}")
 
 
-def perfByParamPlot(parameter):
+def perfByParamPlot(parameter, value=None):
+    # Renders the scatter plot of every value of parameter,
+    # or only that of 'value' if given
     data = numpyfy.tidydf(parameter)
 
     # Convert to costs normalized by optimal
-    minScore = data.min()[2]
+    minScore = data.min().iloc[2]
     data['Average Kendall-Tau Distance'] = data['Average Kendall-Tau Distance'] / minScore
     data.columns = ["Algorithms", parameter, "Average Cost", "Average Time (CPU Seconds)"]
 
-    paramValues = numpyfy.listByParam(parameter)
+    paramValues = numpyfy.listByParam(parameter) if value is None else [value]
 
     # Scatter Plots for algorithm comparison
     for value in paramValues:
@@ -221,26 +206,39 @@ def perfByParamPlot(parameter):
         elif parameter == "k":
             toPlot = data[data.k == value]
 
-        # Pareto Filtering
-        toPlot = toPlot.drop(columns=[parameter])
+        # Pareto Filtering, of the algorithms with results
+        toPlot = toPlot.drop(columns=[parameter]).dropna()
         toPlot = paretoFilterDf(toPlot)
 
         plot = scatterPlot("Average Cost", "Average Time (CPU Seconds)", "Algorithms", toPlot)
         plot.save(f"{parameter}-{value}_scatter{fileType}")
 
 
+def render(task):
+    function, args = task
+    function(*args)
+
+
+def renderAll(tasks, workers=None):
+    # Renders every (function, args) task across a process pool
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for _ in pool.map(render, tasks):
+            pass
+
+
 if __name__ == '__main__':
-    overallComparison()
+    tasks = [(overallComparison, ())]
+
     syntheticFiles = ["mallows_topk_n50_N5000_th0.001_k45.csv",
                     "mallows_topk_n30_N500_th0.01_k15.csv",
                         "mallows_topk_n10_N50_th0.1_k2.csv"]
-    for name in syntheticFiles:
-        fileComparison(name, syntheticDirectory)
+    tasks += [(fileComparison, (name, syntheticDirectory)) for name in syntheticFiles]
 
     realFiles = ["CED-00010-00000046.csv"]
-                            
-    for name in realFiles:
-        fileComparison(name, realDirectory)
+    tasks += [(fileComparison, (name, realDirectory)) for name in realFiles]
+
+    tasks += [(perfByParamPlot, (param, value))
+              for param in ["n", "N", "th", "k"]
+              for value in numpyfy.listByParam(param)]
 
-    for param in ["n", "N", "th", "k"]:
-        perfByParamPlot(param)
\ No newline at end of file
+    renderAll(tasks)
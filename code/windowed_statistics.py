@@ -0,0 +1,96 @@
+from collections import deque
+from sufficient_statistics import SufficientStatistics
+
+"""
+Sufficient statistics (see sufficient_statistics.py) in which old
+top-lists fade out, for rankings of what is trending. Time advances in
+ticks, e.g. one per hour:
+
+    DecayedStatistics multiplies everything seen so far by 'decay' on
+    each tick, so a top-list added t ticks ago has weight decay ** t.
+
+    SlidingWindowStatistics keeps one bucket of statistics per tick and
+    forgets the top-lists of a bucket once it is 'buckets' ticks old.
+
+Neither retains any top-list, so memory is O(n^2) and O(n^2 * buckets)
+respectively, however many top-lists stream through. snapshot() returns
+a SufficientStatistics object that every aggregator except RandomSort
+accepts in place of the Counter, with params['N'] set to its N.
+"""
+
+
+class DecayedStatistics:
+    """
+    Exponentially decayed statistics over n candidates, where the
+    weight of every top-list is multiplied by 'decay' on each tick
+    """
+
+    def __init__(self, n, decay):
+        if not 0 < decay <= 1:
+            raise ValueError(f"decay must be in (0, 1], got {decay}")
+
+        self.decay = decay
+        self.statistics = SufficientStatistics(n)
+
+
+    def add(self, topList, weight=1):
+        self.statistics.add(topList, weight)
+
+
+    def fold(self, candidates, lengths, weights):
+        self.statistics.fold(candidates, lengths, weights)
+
+
+    def tick(self):
+        self.statistics.N *= self.decay
+        self.statistics.precedence *= self.decay
+        self.statistics.rankFrequency *= self.decay
+
+
+    def snapshot(self):
+        return self.statistics.copy()
+
+
+
+class SlidingWindowStatistics:
+    """
+    Statistics over n candidates of the top-lists added during
+    the current tick and the 'buckets' - 1 ticks before it
+    """
+
+    def __init__(self, n, buckets):
+        if buckets < 1:
+            raise ValueError(f"there must be at least one bucket, got {buckets}")
+
+        self.n = n
+        self.buckets = deque([SufficientStatistics(n)], maxlen=buckets)
+        self.total = SufficientStatistics(n)
+
+
+    def add(self, topList, weight=1):
+        self.buckets[-1].add(topList, weight)
+        self.total.add(topList, weight)
+
+
+    def fold(self, candidates, lengths, weights):
+        bucket = SufficientStatistics(self.n)
+        bucket.fold(candidates, lengths, weights)
+        self.buckets[-1].merge(bucket)
+        self.total.merge(bucket)
+
+
+    def tick(self):
+        """
+        Starts a new bucket, expiring the oldest one if the window is full
+        """
+        if len(self.buckets) == self.buckets.maxlen:
+            expired = self.buckets[0]
+            self.total.N -= expired.N
+            self.total.precedence -= expired.precedence
+            self.total.rankFrequency -= expired.rankFrequency
+
+        self.buckets.append(SufficientStatistics(self.n))
+
+
+    def snapshot(self):
+        return self.total.copy()